@@ -0,0 +1,260 @@
+import json
+from datetime import date, datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from auth import require_bearer_token
+from choices import GENRES
+from deletes import delete_rows
+from extensions import typeahead
+from models import db, Venue, Artist, SHOW_DURATION
+from pagination import InvalidCursor, keyset_page
+from queries import VENUE_FIELDS, VENUE_KEYS, ARTIST_FIELDS, ARTIST_KEYS, SHOW_FIELDS, SHOW_KEYS, venues_query, artists_query, shows_query, listing_filters, genre_facets, show_calendar, booking_conflicts
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#
+# /api/v1 endpoints built on the same queries as the HTML pages, read-only but
+# for the batch deletes at the end.
+#
+#   ?fields=id,name     only return these fields
+#   ?city=&state=&genre= filter the listing, shows also take from/to
+#                        (ISO dates) and venue_id/artist_id. genre can be
+#                        repeated, rows need all of them or any with
+#                        &match=any
+#   ?facets=genres      add the number of matches per genre to the page
+#   ?after=&before=     cursors returned by the previous page
+#   ?limit=             page size, up to API_MAX_PAGE_SIZE
+#   ?format=ndjson      stream every match as one JSON object per line
+#                        instead of returning a page
+#
+# /api/v1/shows/calendar?month=2026-11 counts the shows on each day of a month
+# (the current one by default), with the same filters as the show listing.
+#
+# /api/v1/shows/availability?venue_id=&artist_id=&start_time=&duration= says
+# whether a show could be booked then (duration in minutes, two hours by
+# default), listing the venue's and the artist's shows it would overlap.
+#
+# /api/v1/venues/typeahead?q=blu and /api/v1/artists/typeahead?q=blu list the
+# ids and names of the venues or artists with a word starting with q, from
+# the worker's in-memory index.
+#
+# DELETE /api/v1/venues and DELETE /api/v1/artists with {"ids": [12, 40]}
+# delete up to DELETE_MAX_IDS venues or artists and their shows (see
+# deletes.py). They are only served when DELETE_TOKEN is configured and sent
+# back as a bearer token.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+STREAM_BATCH_SIZE = 1000
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+DELETE_MAX_IDS = 1000
+
+
+class BadRequest(Exception):
+  pass
+
+
+@api.errorhandler(BadRequest)
+@api.errorhandler(InvalidCursor)
+def bad_request(error):
+  return jsonify({'error': str(error)}), 400
+
+
+def _json_default(value):
+  if isinstance(value, date):
+    return value.isoformat()
+  return str(value)
+
+
+def _fields(available):
+  requested = request.args.get('fields')
+  if not requested:
+    return list(available)
+  fields = [field.strip() for field in requested.split(',') if field.strip()]
+  unknown = [field for field in fields if field not in available]
+  if unknown:
+    raise BadRequest('Unknown fields: %s' % ', '.join(unknown))
+  return fields
+
+
+def _date_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return None
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    raise BadRequest('%s must be an ISO 8601 date or datetime' % name)
+
+
+def _month_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return date.today().replace(day=1)
+  try:
+    return datetime.strptime(value, '%Y-%m').date()
+  except ValueError:
+    raise BadRequest('%s must be a year and month as YYYY-MM' % name)
+
+
+def _genre_args():
+  genres = request.args.getlist('genre')
+  unknown = [genre for genre in genres if genre not in GENRES]
+  if unknown:
+    raise BadRequest('Unknown genres: %s' % ', '.join(unknown))
+  return {'genres': genres, 'match': 'any' if request.args.get('match') == 'any' else 'all'}
+
+
+def _listing(query, fields, keys, facets=None):
+  # Either streams every row as NDJSON through a server-side cursor, or returns one keyset page, with the
+  # genre facets when they are asked for
+  if request.args.get('format') == 'ndjson':
+    def generate():
+      for row in query.order_by(*[column for name, column, descending in keys]).execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE):
+        yield json.dumps({field: getattr(row, field) for field in fields}, default=_json_default) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+  limit = min(request.args.get('limit', current_app.config['PAGE_SIZE'], type=int), current_app.config['API_MAX_PAGE_SIZE'])
+  rows, prev_cursor, next_cursor = keyset_page(
+    query,
+    keys,
+    max(limit, 1),
+    after=request.args.get('after'),
+    before=request.args.get('before'),
+    strict=True
+  )
+  page = {
+    'data': [{field: getattr(row, field) for field in fields} for row in rows],
+    'prev_cursor': prev_cursor,
+    'next_cursor': next_cursor
+  }
+  if facets is not None and request.args.get('facets') == 'genres':
+    page['facets'] = {'genres': {facet.genre: facet.count for facet in facets}}
+  return current_app.response_class(json.dumps(page, default=_json_default), mimetype='application/json')
+
+
+@api.route('/venues')
+@db.replica_reads
+def venues():
+  fields = _fields(VENUE_FIELDS)
+  filters = dict(_genre_args(), city=request.args.get('city'), state=request.args.get('state'))
+  return _listing(venues_query(fields, **filters), fields, VENUE_KEYS, genre_facets(Venue, *listing_filters(Venue, **filters)))
+
+
+@api.route('/artists')
+@db.replica_reads
+def artists():
+  fields = _fields(ARTIST_FIELDS)
+  filters = dict(_genre_args(), city=request.args.get('city'), state=request.args.get('state'))
+  return _listing(artists_query(fields, **filters), fields, ARTIST_KEYS, genre_facets(Artist, *listing_filters(Artist, **filters)))
+
+
+def _typeahead(kind):
+  limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), TYPEAHEAD_MAX_LIMIT)
+  matches = typeahead.lookup(kind, request.args.get('q', ''), limit)
+  return jsonify({'data': [{'id': row_id, 'name': name} for row_id, name in matches]})
+
+
+@api.route('/venues/typeahead')
+@db.replica_reads
+def venue_typeahead():
+  return _typeahead('venues')
+
+
+@api.route('/artists/typeahead')
+@db.replica_reads
+def artist_typeahead():
+  return _typeahead('artists')
+
+
+@api.route('/shows')
+@db.replica_reads
+def shows():
+  fields = _fields(SHOW_FIELDS)
+  query = shows_query(
+    fields,
+    start=_date_arg('from'),
+    end=_date_arg('to'),
+    city=request.args.get('city'),
+    state=request.args.get('state'),
+    **_genre_args(),
+    venue_id=request.args.get('venue_id', type=int),
+    artist_id=request.args.get('artist_id', type=int)
+  )
+  return _listing(query, fields, SHOW_KEYS)
+
+
+@api.route('/shows/calendar')
+@db.replica_reads
+def calendar():
+  month = _month_arg('month')
+  next_month = (month + timedelta(days=31)).replace(day=1)
+  counts = show_calendar(
+    datetime.combine(month, datetime.min.time()),
+    datetime.combine(next_month, datetime.min.time()),
+    city=request.args.get('city'),
+    state=request.args.get('state'),
+    **_genre_args(),
+    venue_id=request.args.get('venue_id', type=int),
+    artist_id=request.args.get('artist_id', type=int)
+  )
+  counts = {row.day.date(): row.shows for row in counts}
+
+  # Every day of the month is listed, the query only returns the days with shows
+  days = [month + timedelta(days=offset) for offset in range((next_month - month).days)]
+  return jsonify({
+    'month': month.strftime('%Y-%m'),
+    'days': [{'date': day.isoformat(), 'shows': counts.get(day, 0)} for day in days],
+    'total': sum(counts.values())
+  })
+
+
+@api.route('/shows/availability')
+def availability():
+  # Read from the primary rather than a replica, a booking made a moment ago has to count. The exclusion
+  # constraints still have the last word when the show is created
+  start = _date_arg('start_time')
+  if start is None:
+    raise BadRequest('start_time is required')
+  venue_id = request.args.get('venue_id', type=int)
+  artist_id = request.args.get('artist_id', type=int)
+  if not venue_id and not artist_id:
+    raise BadRequest('venue_id or artist_id is required')
+  duration = request.args.get('duration', int(SHOW_DURATION.total_seconds() // 60), type=int)
+  if not 0 < duration <= 24 * 60:
+    raise BadRequest('duration must be a number of minutes up to a day')
+
+  conflicts = booking_conflicts(start, start + timedelta(minutes=duration), venue_id=venue_id, artist_id=artist_id).all()
+  return current_app.response_class(json.dumps({
+    'available': not conflicts,
+    'conflicts': [{
+      'id': show.id,
+      'venue_id': show.venue_id,
+      'artist_id': show.artist_id,
+      'start_time': show.start_time,
+      'end_time': show.end_time
+    } for show in conflicts]
+  }, default=_json_default), mimetype='application/json')
+
+
+def _delete(kind):
+  # Guarded like the exports, with a token of its own
+  require_bearer_token('DELETE_TOKEN')
+  body = request.get_json(silent=True)
+  ids = body.get('ids') if isinstance(body, dict) else None
+  if not isinstance(ids, list) or not all(type(row_id) is int for row_id in ids):
+    raise BadRequest('ids must be a list of integers')
+  if len(ids) > DELETE_MAX_IDS:
+    raise BadRequest('at most %d ids can be deleted at a time' % DELETE_MAX_IDS)
+  return jsonify({'deleted': delete_rows(kind, ids)})
+
+
+@api.route('/venues', methods=['DELETE'])
+def delete_venues():
+  return _delete('venues')
+
+
+@api.route('/artists', methods=['DELETE'])
+def delete_artists():
+  return _delete('artists')
@@ -0,0 +1,214 @@
+from functools import partial
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from models import db, Show, Artist
+from extensions import cache, typeahead
+from matviews import refresh_after_write
+from deletes import delete_rows
+from conditional import conditional
+from pagination import keyset_page
+from pages import search_response, artist_page_data, genre_filter, genre_link_args, genre_facets_data
+from queries import ARTIST_KEYS, artists_query, listing_validator, artist_validator, artist_shows, listing_filters, genre_facets, search_query, search_keys, search_filters
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('artists', __name__)
+
+# An artist's details appear on their own page, the listings and the pages of the venues they play.
+
+def artist_cache_keys(artist_id):
+  venues = Show.query.with_entities(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  return ['artists', 'shows', 'artist:%s' % artist_id] + ['venue:%d' % show.venue_id for show in venues]
+
+def artist_form():
+  # Imported on first use, as in venues.venue_form()
+  from forms import ArtistForm
+  return ArtistForm()
+
+#  Artists
+#  ----------------------------------------------------------------
+@blueprint.route('/artists')
+@db.replica_reads
+@conditional(partial(listing_validator, Artist))
+@cache.cached('artists')
+def artists():
+  data=[]
+  genres, match = genre_filter(request.args)
+
+  # Fetching one page of artists in id order, the cursors in the query string mark where the page starts
+  artists, prev_cursor, next_cursor = keyset_page(
+    artists_query(['id', 'name'], genres=genres, match=match),
+    ARTIST_KEYS,
+    current_app.config['PAGE_SIZE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
+
+  for artist in artists:
+    data.append({
+      'id': artist.id,
+      'name': artist.name
+    })
+
+  # Counted over every matching artist, not only this page
+  facets = genre_facets_data(genre_facets(Artist, *listing_filters(Artist, genres=genres, match=match)).all(), genres, match)
+
+  return render_template('pages/artists.html', artists=data, prev_cursor=prev_cursor, next_cursor=next_cursor, genre_facets=facets, filters=genre_link_args(genres, match))
+
+@blueprint.route('/artists/search', methods=['GET', 'POST'])
+@db.replica_reads
+def search_artists():
+  
+  # The search term comes from the navbar form on the first page and from the query string on the following pages
+  search_term = request.values.get('search_term', '')
+  genres, match = genre_filter(request.values)
+
+  # Query to get the results from the search allowing for case sensitive terms, ranked by how similar the name is to the term
+  matches = search_query(Artist, search_term, genres, match)
+
+  # Fetching one page of matches, best ranked first with the name and id breaking ties
+  search_results, prev_cursor, next_cursor = keyset_page(
+    db.session.query(matches),
+    search_keys(matches),
+    current_app.config['SEARCH_PAGE_SIZE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
+
+  response = search_response(search_results, prev_cursor, next_cursor)
+  facets = genre_facets_data(genre_facets(Artist, *search_filters(Artist, search_term, genres, match)).all(), genres, match, search_term=search_term)
+
+  return render_template('pages/search_artists.html', results=response, search_term=search_term, genre_facets=facets, filters=genre_link_args(genres, match))
+
+@blueprint.route('/artists/<int:artist_id>')
+@db.replica_reads
+@conditional(artist_validator)
+@cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+  artist = Artist.query.get(artist_id) # Query to get the info of the artist using the specific artist id
+
+  # Single joined query returning every show for the artist together with the venue's name and image link
+  artist_data = artist_page_data(artist, artist_shows(artist_id).all())
+
+  return render_template('pages/show_artist.html', artist=artist_data)
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  form = artist_form()
+  
+  # Query to get the details of the artist from the database using the artist id
+  artist = Artist.query.filter(Artist.id == artist_id).first()
+
+  # Populating the form with the artist info retrieved from the database
+  form.name.data = artist.name
+  form.city.data = artist.city
+  form.state.data = artist.state
+  form.phone.data = artist.phone
+  form.genres.data = artist.genres
+  form.image_link.data = artist.image_link
+  form.facebook_link.data = artist.facebook_link
+  form.website_link.data = artist.website_link
+  form.seeking_venue.data = artist.looking_venues
+  form.seeking_description.data = artist.seeking_description
+
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  form = artist_form()
+
+  # Select query to get all the details of the artist from the database
+  artist_edit = Artist.query.get(artist_id)
+
+  try:
+    # Updating the artist's details with those entered/changed in the Artist form
+    artist_edit.name = request.form['name']
+    artist_edit.city = request.form['city'] 
+    artist_edit.state = request.form['state']
+    artist_edit.phone = request.form['phone']
+    artist_edit.genres = request.form.getlist('genres')
+    artist_edit.image_link = request.form['image_link']
+    artist_edit.facebook_link = request.form['facebook_link']
+    artist_edit.website_link = request.form['website_link']
+    artist_edit.looking_venues = True if 'seeking_venue' in request.form else False
+    artist_edit.seeking_description = request.form['seeking_description']
+
+    db.session.commit()
+    refresh_after_write('upcoming_shows') # The show listing carries the artist's name and image
+    cache.invalidate(*artist_cache_keys(artist_id))
+    typeahead.put('artists', artist_id, request.form['name'])
+    flash('Artist: ' + request.form['name'] + ' details have been successfully changed!')
+  except:
+    db.session.rollback()
+    flash('Artist: ' + request.form['name'] + ' details could not be updated.')
+  finally:
+    db.session.close()
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  form = artist_form()
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  form = artist_form()
+  
+  # Assigning each field from the form to the respective columns in the artist table
+  try:
+    artist = Artist(
+      name = request.form['name'],
+      city = request.form['city'],
+      state = request.form['state'],
+      phone = request.form['phone'],
+      genres = request.form.getlist('genres'),
+      image_link = request.form['image_link'],
+      facebook_link = request.form['facebook_link'],
+      website_link = request.form['website_link'],
+      looking_venues = True if 'seeking_venue' in request.form else False,
+      seeking_description = request.form['seeking_description']
+    )
+
+    # Inserting artist form details into the database
+    db.session.add(artist)
+    db.session.flush() # As in create_venue_submission(), the id is read before the commit expires the row
+    artist_id = artist.id
+    db.session.commit()
+    cache.invalidate('artists')
+    typeahead.put('artists', artist_id, request.form['name'])
+    flash('Artist: ' + request.form['name'] + ' was successfully listed!')
+  
+  except:
+    db.session.rollback()
+    flash('An error occurred. Artist: ' + artist.name + ' could not be listed.')
+  
+  finally:
+    db.session.close()
+
+  return render_template('pages/home.html')
+
+#  Delete Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/<artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  try:
+    # As in delete_venue(), the artist's shows go with it and come off their venues' counters
+    delete_rows('artists', [int(artist_id)])
+    flash('Artist was successfully deleted!')
+
+  except:
+    db.session.rollback()
+    flash('Deleting the artist encountered an issue')
+
+  finally:
+    db.session.close()
+
+  return render_template('pages/home.html')
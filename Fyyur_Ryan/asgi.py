@@ -0,0 +1,256 @@
+import asyncio
+import io
+import random
+import sys
+from asgiref.wsgi import WsgiToAsgi
+from flask import render_template, request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import create_app
+from extensions import cache, typeahead
+from pages import venue_areas_data, search_response, venue_page_data, artist_page_data, shows_data, show_filters, shows_page_validator, genre_filter, genre_link_args, genre_facets_data
+from conditional import conditional
+from pagination import keyset_query, keyset_result
+from models import db, Venue, Artist
+from queries import venue_areas, venue_areas_validator, venue_validator, venue_shows, artist_validator, artist_shows, show_listing, listing_filters, genre_facets, search_query, search_keys, search_filters
+
+#----------------------------------------------------------------------------#
+# ASGI serving mode.
+#
+#   uvicorn asgi:application --workers 4
+#
+# The read paths (the venue listing, venue and artist pages, the show listing
+# and both searches) run as coroutines on SQLAlchemy's asyncio engine with
+# asyncpg, so a worker keeps serving other requests while one waits on the
+# database, and queries that do not depend on each other run at the same time
+# on separate connections. They build the same queries and render the same
+# templates as the WSGI views. Every other route is handed to the WSGI app,
+# which asgiref runs in a thread pool.
+#----------------------------------------------------------------------------#
+
+app = create_app()
+wsgi = WsgiToAsgi(app)
+engines = []
+
+
+def read_engine():
+  # One asyncio engine per replica (or for the primary when there are none), created on first use
+  # because the engine belongs to the event loop the server runs
+  if not engines:
+    for uri in app.config['SQLALCHEMY_REPLICA_URIS'] or [app.config['SQLALCHEMY_DATABASE_URI']]:
+      engines.append(create_async_engine(
+        make_url(uri).set(drivername='postgresql+asyncpg'),
+        pool_size=app.config['DATABASE_POOL_SIZE'],
+        max_overflow=app.config['DATABASE_MAX_OVERFLOW'],
+        pool_timeout=app.config['DATABASE_POOL_TIMEOUT'],
+        pool_recycle=app.config['DATABASE_POOL_RECYCLE'],
+        pool_pre_ping=True,
+        connect_args={'server_settings': {'statement_timeout': str(app.config['DATABASE_STATEMENT_TIMEOUT_MS'])}}
+      ))
+  return random.choice(engines)
+
+
+async def fetch(query):
+  # Each query gets its own session and pooled connection so independent queries can be awaited together
+  async with AsyncSession(read_engine()) as session:
+    return (await session.execute(query.statement)).all()
+
+
+async def fetch_first(query):
+  rows = await fetch(query)
+  return rows[0] if rows else None
+
+
+async def fetch_entity(model, entity_id):
+  async with AsyncSession(read_engine()) as session:
+    return await session.get(model, entity_id)
+
+
+#----------------------------------------------------------------------------#
+# Async views.
+#----------------------------------------------------------------------------#
+
+@conditional(venue_areas_validator, fetch=fetch_first)
+@cache.cached('venues')
+async def venues():
+  genres, match = genre_filter(request.args)
+  areas, facets = await asyncio.gather(fetch(venue_areas(genres, match)), fetch(genre_facets(Venue, *listing_filters(Venue, genres=genres, match=match))))
+  return render_template('pages/venues.html', areas=venue_areas_data(areas), genre_facets=genre_facets_data(facets, genres, match))
+
+
+async def search(model, template):
+  search_term = request.values.get('search_term', '')
+  genres, match = genre_filter(request.values)
+  matches = search_query(model, search_term, genres, match)
+  keys = search_keys(matches)
+  query, state = keyset_query(db.session.query(matches), keys, app.config['SEARCH_PAGE_SIZE'], after=request.args.get('after'), before=request.args.get('before'))
+  # The page of matches and the genre counts over all of them run at once
+  rows, facets = await asyncio.gather(fetch(query), fetch(genre_facets(model, *search_filters(model, search_term, genres, match))))
+  search_results, prev_cursor, next_cursor = keyset_result(rows, keys, app.config['SEARCH_PAGE_SIZE'], state)
+  return render_template(
+    template,
+    results=search_response(search_results, prev_cursor, next_cursor),
+    search_term=search_term,
+    genre_facets=genre_facets_data(facets, genres, match, search_term=search_term),
+    filters=genre_link_args(genres, match)
+  )
+
+
+async def search_venues():
+  return await search(Venue, 'pages/search_venues.html')
+
+
+async def search_artists():
+  return await search(Artist, 'pages/search_artists.html')
+
+
+@conditional(venue_validator, fetch=fetch_first)
+@cache.cached('venue:{venue_id}')
+async def show_venue(venue_id):
+  # The venue row and its shows do not depend on each other, so both queries run at once
+  venue, shows = await asyncio.gather(fetch_entity(Venue, venue_id), fetch(venue_shows(venue_id)))
+  return render_template('pages/show_venue.html', venue=venue_page_data(venue, shows))
+
+
+@conditional(artist_validator, fetch=fetch_first)
+@cache.cached('artist:{artist_id}')
+async def show_artist(artist_id):
+  artist, shows = await asyncio.gather(fetch_entity(Artist, artist_id), fetch(artist_shows(artist_id)))
+  return render_template('pages/show_artist.html', artist=artist_page_data(artist, shows))
+
+
+@conditional(shows_page_validator, fetch=fetch_first)
+@cache.cached('shows')
+async def shows():
+  filters, link_args = show_filters(request.args)
+  shows, keys = show_listing(['venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time'], **filters)
+  query, state = keyset_query(shows, keys, app.config['PAGE_SIZE'], after=request.args.get('after'), before=request.args.get('before'))
+  rows, prev_cursor, next_cursor = keyset_result(await fetch(query), keys, app.config['PAGE_SIZE'], state)
+  return render_template('pages/shows.html', shows=shows_data(rows), prev_cursor=prev_cursor, next_cursor=next_cursor, filters=link_args)
+
+
+# Endpoints of the WSGI app served by the coroutines above
+ASYNC_VIEWS = {
+  'venues.venues': venues,
+  'venues.search_venues': search_venues,
+  'venues.show_venue': show_venue,
+  'artists.search_artists': search_artists,
+  'artists.show_artist': show_artist,
+  'shows.shows': shows,
+}
+
+
+#----------------------------------------------------------------------------#
+# Application.
+#----------------------------------------------------------------------------#
+
+def async_view(scope):
+  # Matches the request against the WSGI app's url map, anything that does not land on an async view
+  # (including 404s and redirects) is left to the WSGI app
+  adapter = app.url_map.bind('localhost', script_name=scope.get('root_path') or None)
+  try:
+    endpoint, view_args = adapter.match(scope['path'], scope['method'])
+  except (HTTPException, RequestRedirect):
+    return None
+  return ASYNC_VIEWS.get(endpoint)
+
+
+async def read_body(receive):
+  body = b''
+  while True:
+    message = await receive()
+    body += message.get('body', b'')
+    if not message.get('more_body'):
+      return body
+
+
+def build_environ(scope, body):
+  # The WSGI environ the request context is built from, the same way asgiref builds it for the WSGI app
+  environ = {
+    'REQUEST_METHOD': scope['method'],
+    'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+    'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+    'QUERY_STRING': scope['query_string'].decode('ascii'),
+    'SERVER_PROTOCOL': 'HTTP/%s' % scope['http_version'],
+    'wsgi.version': (1, 0),
+    'wsgi.url_scheme': scope.get('scheme', 'http'),
+    'wsgi.input': io.BytesIO(body),
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': True,
+    'wsgi.multiprocess': True,
+    'wsgi.run_once': False,
+  }
+  server = scope.get('server') or ('localhost', 80)
+  environ['SERVER_NAME'], environ['SERVER_PORT'] = server[0], str(server[1])
+  if scope.get('client'):
+    environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+  for name, value in scope.get('headers', []):
+    name = name.decode('latin1')
+    if name == 'content-length':
+      key = 'CONTENT_LENGTH'
+    elif name == 'content-type':
+      key = 'CONTENT_TYPE'
+    else:
+      key = 'HTTP_%s' % name.upper().replace('-', '_')
+    value = value.decode('latin1')
+    environ[key] = environ[key] + ',' + value if key in environ else value
+  return environ
+
+
+async def dispatch(view, scope, body):
+  # Runs the view inside a regular Flask request context, so before/after request hooks, sessions,
+  # flashes, url_for and the error handlers behave as they do under WSGI
+  context = app.request_context(build_environ(scope, body))
+  context.push()
+  try:
+    try:
+      response = app.preprocess_request()
+      if response is None:
+        response = await view(**request.view_args)
+    except Exception as error:
+      response = app.handle_user_exception(error)
+    return app.finalize_request(response)
+  except Exception as error:
+    return app.handle_exception(error)
+  finally:
+    context.pop()
+
+
+def warm_typeahead():
+  with app.app_context():
+    typeahead.warm()
+
+
+async def lifespan(receive, send):
+  while True:
+    message = await receive()
+    if message['type'] == 'lifespan.startup':
+      # The typeahead indexes are loaded before the server takes requests, in a thread as the queries are synchronous
+      await asyncio.get_running_loop().run_in_executor(None, warm_typeahead)
+      await send({'type': 'lifespan.startup.complete'})
+    elif message['type'] == 'lifespan.shutdown':
+      for engine in engines:
+        await engine.dispose()
+      await send({'type': 'lifespan.shutdown.complete'})
+      return
+
+
+async def application(scope, receive, send):
+  if scope['type'] == 'lifespan':
+    return await lifespan(receive, send)
+
+  view = async_view(scope) if scope['type'] == 'http' else None
+  if view is None:
+    return await wsgi(scope, receive, send)
+
+  response = await dispatch(view, scope, await read_body(receive))
+  await send({
+    'type': 'http.response.start',
+    'status': response.status_code,
+    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+  })
+  await send({'type': 'http.response.body', 'body': response.get_data() if scope['method'] != 'HEAD' else b''})
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+#   flask build-assets
+#
+# Each bundle in ASSET_BUNDLES (config.py) is concatenated from its source
+# files under static/, minified and written to static/dist with a hash of its
+# contents in the name (main.3f9c2a1b7d.css), next to a .gz and, when the
+# brotli package is installed, a .br copy. static/dist/manifest.json maps each
+# bundle to its current file. Templates link bundles with asset_urls(), and
+# the files are served from /static/dist with a one year immutable
+# Cache-Control, in the best encoding the browser accepts. A changed file gets
+# a new name, so browsers never need to revalidate a bundle.
+#
+# Without a build (or with ASSETS_DEBUG set) asset_urls() links the source
+# files one by one instead. JavaScript is minified with rjsmin when it is
+# installed, otherwise the scripts are only concatenated (the libraries are
+# already minified).
+#----------------------------------------------------------------------------#
+
+DIST_FOLDER = 'dist'
+MANIFEST = 'manifest.json'
+
+# Precompressed copies, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def minify_css(source):
+  source = re.sub(r'/\*(?!!).*?\*/', '', source, flags=re.S) # Comments, keeping /*! licence */ ones
+  source = re.sub(r'\s+', ' ', source)
+  source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+  source = re.sub(r':\s+', ':', source)
+  return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+  try:
+    import rjsmin
+  except ImportError:
+    return source
+  return rjsmin.jsmin(source, keep_bang_comments=True)
+
+
+def compressed(data):
+  # The precompressed siblings of a bundle, by file suffix
+  siblings = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+  try:
+    import brotli
+  except ImportError:
+    return siblings
+  siblings['.br'] = brotli.compress(data, quality=11)
+  return siblings
+
+
+def build(static_folder, bundles):
+  '''Writes every bundle, its compressed copies and the manifest to static/dist, returns the manifest.'''
+  dist = os.path.join(static_folder, DIST_FOLDER)
+  os.makedirs(dist, exist_ok=True)
+  manifest = {}
+  for name, sources in bundles.items():
+    stem, extension = os.path.splitext(name)
+    minify = minify_css if extension == '.css' else minify_js
+    parts = []
+    for source in sources:
+      with open(os.path.join(static_folder, source), encoding='utf-8') as source_file:
+        parts.append(minify(source_file.read()))
+    # Scripts get a ; between files so one without a trailing semicolon cannot run into the next
+    data = (';\n' if extension == '.js' else '\n').join(parts).encode('utf-8')
+
+    filename = '%s.%s%s' % (stem, hashlib.sha1(data).hexdigest()[:10], extension)
+    with open(os.path.join(dist, filename), 'wb') as bundle_file:
+      bundle_file.write(data)
+    for suffix, content in compressed(data).items():
+      with open(os.path.join(dist, filename + suffix), 'wb') as sibling_file:
+        sibling_file.write(content)
+    manifest[name] = filename
+
+  # Written last, so a failed build leaves the previous bundles in use. Old bundles are kept for pages
+  # still open in browsers and can be cleared out between deploys
+  with open(os.path.join(dist, MANIFEST), 'w') as manifest_file:
+    json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+  return manifest
+
+
+class Assets(object):
+  '''Flask extension linking and serving the bundles built by build().'''
+
+  def __init__(self, app=None):
+    self.manifest = {}
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    self.app = app
+    self.bundles = app.config['ASSET_BUNDLES']
+    self.dist = os.path.join(app.static_folder, DIST_FOLDER)
+    self.max_age = app.config['ASSETS_MAX_AGE']
+    self.manifest = {}
+    if not app.config['ASSETS_DEBUG']:
+      try:
+        with open(os.path.join(self.dist, MANIFEST)) as manifest_file:
+          self.manifest = json.load(manifest_file)
+      except FileNotFoundError:
+        app.logger.warning('No asset manifest in %s, run flask build-assets. Linking the source files.', self.dist)
+
+    # More specific than the static rule, so Flask matches it first for anything under /static/dist
+    app.add_url_rule(app.static_url_path + '/' + DIST_FOLDER + '/<path:filename>', 'assets', self.serve)
+    app.add_template_global(self.asset_urls)
+    app.extensions['assets'] = self
+
+  def asset_urls(self, name):
+    '''The URLs to link for a bundle, its built file or else its source files.'''
+    if name in self.manifest:
+      return [url_for('assets', filename=self.manifest[name])]
+    return [url_for('static', filename=source) for source in self.bundles[name]]
+
+  def serve(self, filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+      if accepted[encoding] and os.path.isfile(os.path.join(self.dist, filename + suffix)):
+        response = send_from_directory(self.dist, filename + suffix, mimetype=mimetype, max_age=self.max_age)
+        response.content_encoding = encoding
+        break
+    else:
+      response = send_from_directory(self.dist, filename, mimetype=mimetype, max_age=self.max_age)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+  """Bundles, minifies and fingerprints the static assets into static/dist."""
+  manifest = build(current_app.static_folder, current_app.config['ASSET_BUNDLES'])
+  for name, filename in sorted(manifest.items()):
+    click.echo('%s -> %s' % (name, filename))
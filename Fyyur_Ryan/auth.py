@@ -0,0 +1,22 @@
+import hmac
+from flask import abort, current_app, request
+
+#----------------------------------------------------------------------------#
+# Bearer tokens.
+#
+# The exports and the batch deletes are only served to requests sending the
+# token configured for them (EXPORT_TOKEN, DELETE_TOKEN) as
+# "Authorization: Bearer <token>". While the token is unset the endpoint
+# answers 404 as if it did not exist.
+#----------------------------------------------------------------------------#
+
+
+def require_bearer_token(setting):
+  '''Aborts the request unless it sends the token configured as setting.'''
+  token = current_app.config.get(setting)
+  if not token:
+    abort(404)
+  # Compared as bytes, compare_digest() raises on str holding anything but ASCII
+  sent = request.headers.get('Authorization', '').encode()
+  if not hmac.compare_digest(sent, ('Bearer ' + token).encode()):
+    abort(401)
@@ -0,0 +1,205 @@
+#----------------------------------------------------------------------------#
+# ASGI load test.
+#
+# Serves the app twice from a single process each, once as the WSGI app on a
+# synchronous server (one request at a time, like a sync gunicorn worker) and
+# once as asgi.application on uvicorn. Each server gets the same closed-loop
+# load: --concurrency clients cycling through the read paths for --duration
+# seconds. Throughput and latency percentiles are printed side by side. The
+# response cache is switched off so every request reaches the database.
+#
+# On one box the database answers in well under a millisecond and the pages
+# are bound by template rendering, which neither server can overlap. Use
+# --db-latency to put a proxy adding that many milliseconds each way between
+# the servers and Postgres, as a database on another host would, to see what
+# the async read paths gain while requests wait on the database.
+#
+#   python benchmarks/asgi_load_test.py --database-uri postgresql://localhost:5432/fyyur_bench --concurrency 32
+#   python benchmarks/asgi_load_test.py --database-uri ... --db-latency 2
+#----------------------------------------------------------------------------#
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy.engine import make_url
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PATHS = [
+  '/venues',
+  '/venues/1',
+  '/artists/1',
+  '/shows',
+  '/venues/search?search_term=blue',
+  '/artists/search?search_term=wolves',
+]
+
+
+def serve(mode, port):
+  # Runs in the server subprocess, DATABASE_URL is already in its environment
+  if mode == 'wsgi':
+    from app import create_app
+    app = create_app()
+  else:
+    from asgi import app, application
+
+  app.config['CACHE_TYPE'] = 'null'
+  app.extensions['response_cache'].init_app(app)
+  app.logger.setLevel(logging.WARNING)
+  app.config['SQL_SLOW_QUERY_MS'] = 10 ** 9
+  logging.getLogger('werkzeug').setLevel(logging.WARNING)
+  if mode == 'wsgi':
+    from werkzeug.serving import run_simple
+    run_simple('127.0.0.1', port, app, threaded=False, use_reloader=False, use_debugger=False)
+  else:
+    import uvicorn
+    uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning')
+
+
+async def proxy(port, upstream, latency):
+  # Forwards connections to Postgres, holding every chunk back by latency seconds in each direction
+  async def pipe(reader, writer):
+    try:
+      while True:
+        data = await reader.read(65536)
+        if not data:
+          break
+        await asyncio.sleep(latency)
+        writer.write(data)
+        await writer.drain()
+    finally:
+      writer.close()
+
+  async def connect(client_reader, client_writer):
+    if upstream.startswith('/'):
+      server_reader, server_writer = await asyncio.open_unix_connection(upstream)
+    else:
+      host, server_port = upstream.rsplit(':', 1)
+      server_reader, server_writer = await asyncio.open_connection(host, int(server_port))
+    await asyncio.gather(pipe(client_reader, server_writer), pipe(server_reader, client_writer), return_exceptions=True)
+
+  server = await asyncio.start_server(connect, '127.0.0.1', port)
+  async with server:
+    await server.serve_forever()
+
+
+def proxied(database_uri, port):
+  # The URI to reach the database through the proxy and the address the proxy forwards to
+  url = make_url(database_uri)
+  socket_dir = url.query.get('host')
+  if socket_dir and socket_dir.startswith('/'):
+    upstream = '%s/.s.PGSQL.%d' % (socket_dir, url.port or 5432)
+  else:
+    upstream = '%s:%d' % (url.host or 'localhost', url.port or 5432)
+  url = url.set(host='127.0.0.1', port=port, query={name: value for name, value in url.query.items() if name != 'host'})
+  return url.render_as_string(hide_password=False), upstream
+
+
+async def wait_until_up(base_url):
+  async with httpx.AsyncClient(base_url=base_url) as client:
+    for attempt in range(100):
+      try:
+        await client.get('/')
+        return
+      except httpx.TransportError:
+        await asyncio.sleep(0.1)
+  raise SystemExit('server at %s did not start' % base_url)
+
+
+async def load(base_url, concurrency, duration):
+  timings = []
+  errors = 0
+  deadline = time.perf_counter() + duration
+  limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+  async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+    # Warm up every path once so both servers start with connections and templates loaded
+    for path in PATHS:
+      await client.get(path)
+
+    async def worker(offset):
+      nonlocal errors
+      number = offset
+      while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(PATHS[number % len(PATHS)])
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+          errors += 1
+        number += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(offset) for offset in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+  timings.sort()
+  return {
+    'requests': len(timings),
+    'errors': errors,
+    'rps': len(timings) / elapsed,
+    'p50_ms': timings[len(timings) // 2] * 1000,
+    'p95_ms': timings[int(len(timings) * 0.95)] * 1000,
+    'p99_ms': timings[int(len(timings) * 0.99)] * 1000,
+  }
+
+
+def run_server(mode, port, database_uri, concurrency, duration):
+  env = dict(os.environ, DATABASE_URL=database_uri)
+  server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port)], env=env)
+  try:
+    base_url = 'http://127.0.0.1:%d' % port
+    asyncio.run(wait_until_up(base_url))
+    return asyncio.run(load(base_url, concurrency, duration))
+  finally:
+    server.terminate()
+    server.wait()
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the WSGI and ASGI read paths under concurrent load.')
+  parser.add_argument('--database-uri', help='seeded database, see route_benchmark.py')
+  parser.add_argument('--concurrency', type=int, default=32)
+  parser.add_argument('--duration', type=float, default=15, help='seconds of load per server')
+  parser.add_argument('--db-latency', type=float, default=0, help='milliseconds added each way between the app and Postgres')
+  parser.add_argument('--port', type=int, default=5055)
+  parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+  parser.add_argument('--proxy', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.serve:
+    return serve(args.serve, args.port)
+  if args.proxy:
+    return asyncio.run(proxy(args.port, args.proxy, args.db_latency / 1000))
+  if not args.database_uri:
+    parser.error('--database-uri is required')
+
+  database_uri = args.database_uri
+  latency_proxy = None
+  if args.db_latency:
+    database_uri, upstream = proxied(args.database_uri, args.port + 1)
+    latency_proxy = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--proxy', upstream, '--port', str(args.port + 1), '--db-latency', str(args.db_latency)])
+
+  results = {}
+  try:
+    for mode in ('wsgi', 'asgi'):
+      results[mode] = run_server(mode, args.port, database_uri, args.concurrency, args.duration)
+  finally:
+    if latency_proxy:
+      latency_proxy.terminate()
+      latency_proxy.wait()
+
+  print('%d concurrent clients, %.0fs per server, %.1fms added each way to the database' % (args.concurrency, args.duration, args.db_latency))
+  print('%-6s %10s %8s %10s %10s %10s %8s' % ('', 'requests', 'req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'errors'))
+  for mode, result in results.items():
+    print('%-6s %10d %8.1f %10.1f %10.1f %10.1f %8d' % (mode, result['requests'], result['rps'], result['p50_ms'], result['p95_ms'], result['p99_ms'], result['errors']))
+  print('throughput gain: %.2fx' % (results['asgi']['rps'] / results['wsgi']['rps']))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,145 @@
+#----------------------------------------------------------------------------#
+# Synthetic dataset.
+#
+# Deterministic generator for the benchmarks: the same seed, sizes and
+# reference date always produce the same venues, artists and shows. Cities
+# and genres follow skewed distributions (a few big cities and popular
+# genres, a long tail of the rest) and popular venues host more shows, so the
+# pages see realistic group sizes. It empties the tables first, so only point
+# it at a scratch database.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from forms import VenueForm
+from models import db, Show, Venue, Artist, SHOW_DURATION
+from matviews import refresh
+from partitions import create_partitions
+
+CITIES = [
+  (('New York', 'NY'), 18), (('Los Angeles', 'CA'), 12), (('San Francisco', 'CA'), 10), (('Brooklyn', 'NY'), 8),
+  (('Chicago', 'IL'), 8), (('Austin', 'TX'), 7), (('Nashville', 'TN'), 6), (('Seattle', 'WA'), 5),
+  (('New Orleans', 'LA'), 5), (('Denver', 'CO'), 4), (('Atlanta', 'GA'), 4), (('Boston', 'MA'), 4),
+  (('Portland', 'OR'), 3), (('Philadelphia', 'PA'), 3), (('Miami', 'FL'), 3),
+]
+
+# Genre popularity falls off with its position in the form's choice list shuffled once with a fixed seed
+GENRES = [genre for genre, label in VenueForm.genres.kwargs['choices']]
+random.Random(0).shuffle(GENRES)
+GENRE_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(GENRES))]
+
+NAME_WORDS = ['Blue', 'Velvet', 'Electric', 'Golden', 'Neon', 'Silver', 'Midnight', 'Crimson', 'Echo', 'Wild',
+              'Lunar', 'Rusty', 'Hollow', 'Paper', 'Iron', 'Broken', 'Little', 'Grand', 'Secret', 'Lost']
+VENUE_WORDS = ['Room', 'Hall', 'Lounge', 'Club', 'Tavern', 'Theatre', 'Garden', 'Cellar', 'Stage', 'House']
+ARTIST_WORDS = ['Foxes', 'Tides', 'Wolves', 'Parade', 'Collective', 'Trio', 'Brothers', 'Machines', 'Quartet', 'Saints']
+
+BATCH_SIZE = 5000
+SLOT = timedelta(minutes=30)
+
+
+def _genres(generator):
+  return sorted(set(generator.choices(GENRES, GENRE_WEIGHTS, k=generator.randint(1, 3))))
+
+
+def _name(generator, words, number):
+  return '%s %s %s %d' % (generator.choice(NAME_WORDS), generator.choice(NAME_WORDS), generator.choice(words), number)
+
+
+def _insert(model, rows):
+  for start in range(0, len(rows), BATCH_SIZE):
+    db.session.execute(model.__table__.insert(), rows[start:start + BATCH_SIZE])
+
+
+def generate(venues=200, artists=500, shows=5000, seed=1, reference=None):
+  '''
+  Replaces the catalogue with a synthetic one and returns the sizes used. Shows fall between a year before
+  and six months after the reference date (today by default) and the show counters are filled in.
+  '''
+  generator = random.Random(seed)
+  reference = reference or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+  cities = [city for city, weight in CITIES]
+  city_weights = [weight for city, weight in CITIES]
+
+  create_partitions(reference - timedelta(days=365), reference + timedelta(days=181)) # Any the shows below need, each committed on its own
+  db.session.execute(text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY CASCADE'))
+
+  venue_rows = []
+  for number in range(1, venues + 1):
+    city, state = generator.choices(cities, city_weights)[0]
+    venue_rows.append({
+      'name': _name(generator, VENUE_WORDS, number),
+      'city': city,
+      'state': state,
+      'address': '%d %s Street' % (generator.randint(1, 999), generator.choice(NAME_WORDS)),
+      'phone': '555-%03d-%04d' % (generator.randint(100, 999), generator.randint(0, 9999)),
+      'image_link': 'https://images.example.com/venues/%d.jpg' % number,
+      'facebook_link': 'https://www.facebook.com/venue%d' % number,
+      'genres': _genres(generator),
+      'website_link': 'https://venue%d.example.com' % number,
+      'looking_talent': generator.random() < 0.3,
+      'seeking_description': 'Looking for local acts' if generator.random() < 0.3 else ''
+    })
+  _insert(Venue, venue_rows)
+
+  artist_rows = []
+  for number in range(1, artists + 1):
+    city, state = generator.choices(cities, city_weights)[0]
+    artist_rows.append({
+      'name': _name(generator, ARTIST_WORDS, number),
+      'city': city,
+      'state': state,
+      'phone': '555-%03d-%04d' % (generator.randint(100, 999), generator.randint(0, 9999)),
+      'genres': _genres(generator),
+      'image_link': 'https://images.example.com/artists/%d.jpg' % number,
+      'facebook_link': 'https://www.facebook.com/artist%d' % number,
+      'website_link': 'https://artist%d.example.com' % number,
+      'looking_venues': generator.random() < 0.4,
+      'seeking_description': ''
+    })
+  _insert(Artist, artist_rows)
+
+  # Venue and artist popularity is Zipf-like so a few of them carry most of the shows
+  venue_weights = [1.0 / rank for rank in range(1, venues + 1)]
+  artist_weights = [1.0 / rank ** 0.8 for rank in range(1, artists + 1)]
+  now = datetime.now()
+  show_rows = []
+  booked = set()
+  for number in range(shows):
+    # Shows start on the half hour and last SHOW_DURATION, a draw overlapping a booking of its venue or artist
+    # within that is drawn again so the exclusion constraints accept every row
+    while True:
+      start_time = reference + timedelta(days=generator.randint(-365, 180), hours=generator.choice([18, 19, 20, 21, 22]), minutes=generator.choice([0, 30]))
+      venue_id = generator.choices(range(1, venues + 1), venue_weights)[0]
+      artist_id = generator.choices(range(1, artists + 1), artist_weights)[0]
+      slots = [start_time + SLOT * step for step in range(1 - SHOW_DURATION // SLOT, SHOW_DURATION // SLOT)]
+      if not any((key, slot) in booked for key in (('venue', venue_id), ('artist', artist_id)) for slot in slots):
+        break
+    booked.update({(('venue', venue_id), start_time), (('artist', artist_id), start_time)})
+    show_rows.append({
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': start_time,
+      'duration': SHOW_DURATION,
+      'counted_as_upcoming': start_time > now
+    })
+  _insert(Show, show_rows)
+
+  for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+    db.session.execute(text('''
+      UPDATE "{table}" SET upcoming_shows_count = counts.upcoming, past_shows_count = counts.past
+      FROM (
+        SELECT {key} AS id,
+          count(*) FILTER (WHERE counted_as_upcoming) AS upcoming,
+          count(*) FILTER (WHERE NOT counted_as_upcoming) AS past
+        FROM "Show" GROUP BY {key}
+      ) AS counts
+      WHERE "{table}".id = counts.id
+    '''.format(table=table, key=key)))
+  db.session.commit()
+  db.session.execute(text('ANALYZE "Venue", "Artist", "Show"'))
+  db.session.commit()
+  refresh() # So the materialized views match the new catalogue
+  return {'venues': venues, 'artists': artists, 'shows': shows, 'seed': seed}
@@ -0,0 +1,76 @@
+#----------------------------------------------------------------------------#
+# Datetime filter benchmark.
+#
+# Formats the start times of N show tiles with the original filter (string in,
+# dateutil parse, babel.dates.format_datetime) and with the current one
+# (datetime in, compiled pattern, LRU of formatted values). No database needed:
+#
+#   python benchmarks/datetime_benchmark.py --tiles 10000
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import format_datetime
+
+
+def original_format_datetime(value, format='medium'):
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format, locale='en')
+
+
+def start_times(tiles, seed):
+  # Shows start on the hour or half hour in the evening over the next year, so many tiles share a start time
+  generator = random.Random(seed)
+  base = datetime(2026, 1, 1)
+  return [base + timedelta(days=generator.randrange(365), hours=generator.choice([18, 19, 20, 21, 22]), minutes=generator.choice([0, 30])) for _ in range(tiles)]
+
+
+def run(label, render, values, repeat):
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    for value in values:
+      render(value)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  print('%-10s %8.1f ms per %d tiles %10.0f tiles/s' % (label, best * 1000, len(values), len(values) / best))
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the original and current datetime filters.')
+  parser.add_argument('--tiles', type=int, default=10000)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--seed', type=int, default=1)
+  args = parser.parse_args()
+
+  values = start_times(args.tiles, args.seed)
+  strings = [str(value) for value in values]
+  mismatches = sum(original_format_datetime(string, 'full') != format_datetime(value, 'full') for string, value in zip(strings, values))
+  if mismatches:
+    sys.exit('%d tiles render differently' % mismatches)
+
+  original = run('original', lambda value: original_format_datetime(value, 'full'), strings, args.repeat)
+  # The first pass of the current filter runs with an empty LRU, the later ones show the warm cache
+  format_datetime.cache_clear()
+  cold = run('cold', lambda value: format_datetime(value, 'full'), values, 1)
+  warm = run('warm', lambda value: format_datetime(value, 'full'), values, args.repeat)
+  print('speedup: %.1fx cold, %.1fx warm' % (original / cold, original / warm))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Cold start benchmark.
+#
+# Boots a worker the way each server does, importing the app and building it
+# with create_app() (or importing asgi, which builds it too), in a fresh
+# interpreter under python -X importtime, --repeat times. It prints the median
+# boot time and the modules that cost the most to import, and fails when a
+# module that is meant to load on first use (Alembic, babel.dates, dateutil) is
+# imported at boot. No database is needed, create_app() does not connect.
+#
+#   python benchmarks/import_time.py
+#   python benchmarks/import_time.py --update-baseline
+#   python benchmarks/import_time.py --check-latency
+#
+# Boot times depend on the machine, so the median is only compared with
+# benchmarks/import_time_baseline.json with --check-latency, against a
+# baseline recorded on the same machine with --update-baseline.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_time_baseline.json')
+
+# What a worker runs at boot, per server
+ENTRY_POINTS = {
+  'wsgi': 'from app import create_app; create_app()',
+  'asgi': 'import asgi',
+}
+
+# Only imported by the code that uses them, a worker should boot without them
+DEFERRED_MODULES = ['alembic', 'flask_migrate', 'babel.dates', 'dateutil', 'flask_moment']
+
+BOOT = '''
+import json, sys, time
+started = time.perf_counter()
+%s
+print(json.dumps({'ms': (time.perf_counter() - started) * 1000, 'modules': sorted(sys.modules)}))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def boot(statement):
+  env = dict(os.environ, DATABASE_URL=os.environ.get('DATABASE_URL', 'postgresql://localhost/fyyur'))
+  result = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', BOOT % statement],
+    cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+  )
+  run = json.loads(result.stdout.strip().splitlines()[-1])
+
+  # Cumulative import time in milliseconds of the modules two levels down, the entry point and what it imports
+  run['imports'] = {}
+  for line in result.stderr.splitlines():
+    match = IMPORTTIME_LINE.match(line)
+    if match and len(match.group(3)) <= 3:
+      run['imports'][match.group(4)] = int(match.group(2)) / 1000
+  return run
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure how long a worker takes to import and build the app.')
+  parser.add_argument('--repeat', type=int, default=10, help='fresh interpreters booted per entry point')
+  parser.add_argument('--top', type=int, default=10, help='slowest imports listed per entry point')
+  parser.add_argument('--baseline', default=BASELINE)
+  parser.add_argument('--update-baseline', action='store_true', help='store this run as the new baseline')
+  parser.add_argument('--check-latency', action='store_true', help='also fail on boot slowdowns, with a baseline from this machine')
+  parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown of the median, 0.25 is 25%%')
+  parser.add_argument('--floor', type=float, default=30, help='milliseconds of slowdown always allowed')
+  args = parser.parse_args()
+
+  results = {}
+  failures = []
+  for name, statement in ENTRY_POINTS.items():
+    runs = [boot(statement) for attempt in range(args.repeat)]
+    median = statistics.median(run['ms'] for run in runs)
+    results[name] = {'median_ms': round(median, 1)}
+
+    print('%s: %.1fms median boot over %d runs (%s)' % (name, median, args.repeat, statement))
+    slowest = sorted(runs[-1]['imports'].items(), key=lambda item: -item[1])[:args.top]
+    for module, ms in slowest:
+      print('  %8.1fms  %s' % (ms, module))
+
+    loaded = set(runs[-1]['modules'])
+    for module in DEFERRED_MODULES:
+      if module in loaded:
+        failures.append('%s: %s is imported at boot' % (name, module))
+
+  if args.update_baseline:
+    with open(args.baseline, 'w') as baseline_file:
+      json.dump(results, baseline_file, indent=2, sort_keys=True)
+      baseline_file.write('\n')
+    print('baseline written to %s' % args.baseline)
+  elif args.check_latency:
+    with open(args.baseline) as baseline_file:
+      baseline = json.load(baseline_file)
+    for name, result in sorted(results.items()):
+      expected = baseline[name]['median_ms']
+      if result['median_ms'] > expected * (1 + args.tolerance) + args.floor:
+        failures.append('%s: %.1fms median boot, baseline %.1fms' % (name, result['median_ms'], expected))
+
+  for failure in failures:
+    print('REGRESSION ' + failure)
+  if failures:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,119 @@
+#----------------------------------------------------------------------------#
+# Query plan check.
+#
+# Drives every read route through the Flask test client, captures the SQL each
+# controller issues and runs EXPLAIN on it. Sequential scans are disabled for
+# the EXPLAIN so a small seeded database still shows whether an index could be
+# used; any plan that still reads "Show" with a Seq Scan fails the run.
+#
+#   python benchmarks/query_plan_check.py --database-uri postgresql://localhost:5432/fyyur_bench
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import sys
+
+from flask import request, has_request_context, url_for
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Venue, Artist
+
+app = create_app()
+
+SEARCH_ROUTES = {
+  'venues.search_venues': {'search_term': 'a'},
+  'artists.search_artists': {'search_term': 'a'},
+}
+# Query strings for the GET routes that need some, filled in from the ids like the path arguments
+QUERY_ARGS = {
+  'api.availability': lambda ids: {'venue_id': ids['venue_id'], 'artist_id': ids['artist_id'], 'start_time': '2030-01-01T20:00'},
+}
+CHECKED_TABLE = 'Show'
+EXPORT_TOKEN = 'query-plan-check'
+
+
+def read_routes(ids):
+  # Every GET route in the app plus the search forms, with ids filled in from the seeded data
+  routes = []
+  with app.test_request_context():
+    for rule in app.url_map.iter_rules():
+      if rule.endpoint in ('static', 'assets'):
+        continue
+      args = {name: ids[name] for name in rule.arguments}
+      if rule.endpoint in SEARCH_ROUTES:
+        routes.append(('POST', url_for(rule.endpoint, **args), SEARCH_ROUTES[rule.endpoint]))
+      elif 'GET' in rule.methods:
+        query = QUERY_ARGS[rule.endpoint](ids) if rule.endpoint in QUERY_ARGS else {}
+        routes.append(('GET', url_for(rule.endpoint, **args, **query), None))
+  return sorted(set((method, path, json.dumps(data)) for method, path, data in routes))
+
+
+def seq_scans(plan):
+  # Walks the JSON plan tree and yields every sequential scan of the checked table or one of its partitions
+  relation = plan.get('Relation Name') or ''
+  if plan.get('Node Type') == 'Seq Scan' and (relation == CHECKED_TABLE or relation.startswith(CHECKED_TABLE + '_')):
+    yield plan
+  for child in plan.get('Plans', []):
+    yield from seq_scans(child)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Fail if any controller query sequentially scans the Show table.')
+  parser.add_argument('--database-uri', required=True, help='seeded database to run the routes against')
+  args = parser.parse_args()
+
+  app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+  app.config['WTF_CSRF_ENABLED'] = False
+  app.config['EXPORT_TOKEN'] = EXPORT_TOKEN
+  client = app.test_client()
+  captured = []
+
+  def capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith('SELECT'):
+      captured.append((request.endpoint if has_request_context() else None, statement, parameters))
+
+  with app.app_context():
+    ids = {
+      'venue_id': db.session.query(Venue.id).order_by(Venue.id).limit(1).scalar(),
+      'artist_id': db.session.query(Artist.id).order_by(Artist.id).limit(1).scalar(),
+      # The full table exports read every row on purpose, the show listing export has to use the index
+      'table': 'show_listing',
+      'format': 'csv',
+    }
+    if None in (ids['venue_id'], ids['artist_id']):
+      sys.exit('the database needs at least one venue and one artist')
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+      for method, path, data in read_routes(ids):
+        client.open(path, method=method, data=json.loads(data), headers={'Authorization': 'Bearer ' + EXPORT_TOKEN}).get_data()
+    finally:
+      event.remove(db.engine, 'before_cursor_execute', capture)
+
+    failures = 0
+    connection = db.engine.raw_connection()
+    try:
+      cursor = connection.cursor()
+      cursor.execute('SET enable_seqscan = off')
+      for endpoint, statement, parameters in captured:
+        if '"%s"' % CHECKED_TABLE not in statement:
+          continue
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0][0]['Plan']
+        scans = list(seq_scans(plan))
+        print('%-6s %-22s %s' % ('FAIL' if scans else 'ok', endpoint, ' '.join(statement.split())[:100]))
+        failures += bool(scans)
+    finally:
+      connection.rollback()
+      connection.close()
+
+  print('%d of %d statements scan "%s" sequentially' % (failures, len(captured), CHECKED_TABLE))
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,86 @@
+#----------------------------------------------------------------------------#
+# Replica routing check.
+#
+# Runs the app against two Postgres servers, one standing in as the primary
+# and one as a read replica (a copy of the same schema is enough, replication
+# is not needed), and records which server each statement went to. Views
+# marked with @db.replica_reads must only read from the replica, every other
+# view must stay on the primary, and a write followed by a read in the same
+# session must read from the primary.
+#
+#   python benchmarks/replica_routing_check.py \
+#     --primary-uri postgresql://localhost:5432/fyyur_bench \
+#     --replica-uri postgresql://localhost:5433/fyyur_bench
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Check which views read from the replica.')
+  parser.add_argument('--primary-uri', required=True)
+  parser.add_argument('--replica-uri', required=True, help='a second server with the same schema and at least one venue and artist')
+  args = parser.parse_args()
+
+  # The replica binds are set up when the app is created, so the URIs go in through the environment
+  os.environ['DATABASE_URL'] = args.primary_uri
+  os.environ['DATABASE_REPLICA_URLS'] = args.replica_uri
+  from models import db, Venue
+  from route_benchmark import app, EXPORT_TOKEN, read_routes, venue_form
+
+  app.config['EXPORT_TOKEN'] = EXPORT_TOKEN
+  app.config['CACHE_TYPE'] = 'null'
+  app.extensions['response_cache'].init_app(app)
+  client = app.test_client()
+  servers = {}
+
+  def record(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+      servers.setdefault(request.endpoint, set()).add('replica' if conn.engine.url.render_as_string() == db.get_engine(app, bind='replica_0').url.render_as_string() else 'primary')
+
+  failures = []
+  with app.app_context():
+    event.listen(Engine, 'after_cursor_execute', record)
+    try:
+      for name, method, path, data in read_routes({'venue_id': 1, 'artist_id': 1}):
+        client.open(path, method=method, data=data, headers={'Authorization': 'Bearer ' + EXPORT_TOKEN}).get_data()
+      client.post('/venues/create', data=venue_form(0))
+
+      # A read after a write in the same session has to see the write
+      with app.test_request_context():
+        session = db.session()
+        session.use_replica = True
+        venue = Venue(**{'name': 'Replica Check', 'city': 'Austin', 'state': 'TX', 'address': '1 Main Street', 'phone': '555-000-0000', 'genres': [], 'looking_talent': False})
+        session.add(venue)
+        session.flush()
+        if Venue.query.filter_by(id=venue.id).first() is None:
+          failures.append('a read after a write in the same session went to the replica')
+        session.rollback()
+    finally:
+      event.remove(Engine, 'after_cursor_execute', record)
+
+    db.session.execute(Venue.__table__.delete().where(Venue.name.like('Benchmark Venue %')))
+    db.session.commit()
+
+  for endpoint, used in sorted(servers.items(), key=lambda item: str(item[0])):
+    expected = 'replica' if getattr(app.view_functions.get(endpoint), 'replica_reads', False) else 'primary'
+    print('%-32s %-8s %s' % (endpoint, expected, ', '.join(sorted(used))))
+    if used != {expected}:
+      failures.append('%s should only use the %s, used %s' % (endpoint, expected, ', '.join(sorted(used))))
+
+  for failure in failures:
+    print('FAIL ' + failure)
+  if failures:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,339 @@
+#----------------------------------------------------------------------------#
+# Route benchmark.
+#
+# Seeds a scratch database with the synthetic dataset from dataset.py, drives
+# every route in the app through the Flask test client and records latency
+# percentiles, SQL statements and rows fetched per route. The numbers are
+# compared with benchmarks/baseline.json and any route that issues more
+# statements or fetches more rows than the tolerances allow fails the run,
+# as does one that got slower when --check-latency is given. The response
+# cache is switched off so every request reaches the database. Rows read
+# through a server-side cursor (the NDJSON and export streams) are not
+# counted.
+#
+#   python benchmarks/route_benchmark.py --database-uri postgresql://localhost:5432/fyyur_bench
+#   python benchmarks/route_benchmark.py --database-uri ... --update-baseline
+#   python benchmarks/route_benchmark.py --database-uri ... --check-latency
+#
+# Latencies depend on the machine, so they are only compared with
+# --check-latency, against a baseline recorded on the same machine with
+# --update-baseline. The statement and row counts hold anywhere.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Show, Venue, Artist
+from dataset import generate
+
+app = create_app()
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+EXPORT_TOKEN = 'benchmark' # Also sent as the batch deletes' token
+BATCH_SIZE = 10 # Rows per batch delete request
+
+
+def venue_form(number):
+  return {
+    'name': 'Benchmark Venue %d' % number,
+    'city': 'Austin',
+    'state': 'TX',
+    'address': '%d Congress Avenue' % number,
+    'phone': '555-010-%04d' % number,
+    'image_link': 'https://images.example.com/benchmark/venue.jpg',
+    'facebook_link': 'https://www.facebook.com/benchmarkvenue',
+    'genres': ['Rock n Roll', 'Blues'],
+    'website_link': 'https://benchmark.example.com',
+    'seeking_talent': 'y',
+    'seeking_description': 'Benchmark venue'
+  }
+
+
+def artist_form(number):
+  return {
+    'name': 'Benchmark Artist %d' % number,
+    'city': 'Austin',
+    'state': 'TX',
+    'phone': '555-020-%04d' % number,
+    'genres': ['Blues'],
+    'image_link': 'https://images.example.com/benchmark/artist.jpg',
+    'facebook_link': 'https://www.facebook.com/benchmarkartist',
+    'website_link': 'https://benchmark.example.com',
+    'seeking_description': ''
+  }
+
+
+def read_routes(ids):
+  # (name, method, path, form data); the busiest venue and artist have the longest detail pages
+  venue_id, artist_id = ids['venue_id'], ids['artist_id']
+  week = datetime.now().date() + timedelta(days=7)
+  next_month = (datetime.now().date().replace(day=1) + timedelta(days=31)).strftime('%Y-%m')
+  return [
+    ('home', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('venues_genres', 'GET', '/venues?genre=Jazz&genre=Blues&match=any', None),
+    ('venue', 'GET', '/venues/%d' % venue_id, None),
+    ('venue_edit_form', 'GET', '/venues/%d/edit' % venue_id, None),
+    ('venue_create_form', 'GET', '/venues/create', None),
+    ('venue_search', 'GET', '/venues/search?search_term=blue', None),
+    ('venue_search_post', 'POST', '/venues/search', {'search_term': 'blue'}),
+    ('artists', 'GET', '/artists', None),
+    ('artists_genres', 'GET', '/artists?genre=Jazz&genre=Rock+n+Roll', None),
+    ('artist', 'GET', '/artists/%d' % artist_id, None),
+    ('artist_edit_form', 'GET', '/artists/%d/edit' % artist_id, None),
+    ('artist_create_form', 'GET', '/artists/create', None),
+    ('artist_search', 'GET', '/artists/search?search_term=wolves', None),
+    ('artist_search_post', 'POST', '/artists/search', {'search_term': 'wolves'}),
+    ('artist_search_genre', 'GET', '/artists/search?search_term=wolves&genre=Jazz', None),
+    ('shows', 'GET', '/shows', None),
+    ('shows_range', 'GET', '/shows?from=%s&to=%s&city=New+York&state=NY' % (week, week + timedelta(days=7)), None),
+    ('show_create_form', 'GET', '/shows/create', None),
+    ('api_venues', 'GET', '/api/v1/venues?city=New+York', None),
+    ('api_artists', 'GET', '/api/v1/artists?genre=Jazz', None),
+    ('api_venues_facets', 'GET', '/api/v1/venues?genre=Jazz&facets=genres', None),
+    ('api_shows', 'GET', '/api/v1/shows?city=Chicago', None),
+    ('api_shows_ndjson', 'GET', '/api/v1/shows?format=ndjson&venue_id=%d' % venue_id, None),
+    ('api_show_calendar', 'GET', '/api/v1/shows/calendar?month=%s' % next_month, None),
+    ('api_show_calendar_venue', 'GET', '/api/v1/shows/calendar?month=%s&venue_id=%d' % (next_month, venue_id), None),
+    ('api_venue_typeahead', 'GET', '/api/v1/venues/typeahead?q=blue', None),
+    ('api_artist_typeahead', 'GET', '/api/v1/artists/typeahead?q=wol', None),
+    ('api_show_availability', 'GET', '/api/v1/shows/availability?venue_id=%d&artist_id=%d&start_time=%sT20:00' % (venue_id, artist_id, week), None),
+    ('export_show_listing', 'GET', '/exports/show_listing.csv', None),
+  ]
+
+
+class StatementCounter(object):
+  '''Counts the statements run on the engine and the rows their cursors report.'''
+
+  def __init__(self):
+    self.statements = 0
+    self.rows = 0
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    self.statements += 1
+    if cursor.description is not None and cursor.rowcount > 0:
+      self.rows += cursor.rowcount
+
+  def reset(self):
+    self.statements = 0
+    self.rows = 0
+
+
+def percentile(timings, fraction):
+  ordered = sorted(timings)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def request_route(client, method, path, data):
+  headers = {'Authorization': 'Bearer ' + EXPORT_TOKEN}
+  # The API takes JSON bodies, the pages form data
+  body = {'json': data} if path.startswith('/api/') else {'data': data}
+  response = client.open(path, method=method, headers=headers, **body)
+  response.get_data() # Streamed responses only run their queries while the body is read
+  if response.status_code >= 400:
+    raise SystemExit('%s %s returned %d' % (method, path, response.status_code))
+  return response
+
+
+def measure(client, counter, method, paths):
+  # Times one request per path and returns the timings with the statements and rows of the last request
+  timings = []
+  for path, data in paths:
+    counter.reset()
+    start = time.perf_counter()
+    request_route(client, method, path, data)
+    timings.append(time.perf_counter() - start)
+  return {
+    'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+    'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+    'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+    'statements': counter.statements,
+    'rows': counter.rows,
+  }
+
+
+def batch_rows(count):
+  # Venues and artists for the batch deletes, inserted straight into the tables with an upcoming show for each pair
+  ids = {}
+  fields = {
+    Venue: {'city': 'Austin', 'state': 'TX', 'address': '1 Congress Avenue', 'genres': ['Blues'], 'upcoming_shows_count': 1},
+    Artist: {'city': 'Austin', 'state': 'TX', 'genres': ['Blues'], 'upcoming_shows_count': 1},
+  }
+  for model in (Venue, Artist):
+    first = db.session.execute(text('SELECT coalesce(max(id), 0) + 1 FROM "%s"' % model.__tablename__)).scalar()
+    db.session.execute(model.__table__.insert(), [dict(fields[model], name='Benchmark Batch %d' % number) for number in range(count)])
+    ids[model] = [row.id for row in model.query.with_entities(model.id).filter(model.id >= first).order_by(model.id)]
+  start_time = datetime.now() + timedelta(days=60)
+  db.session.execute(Show.__table__.insert(), [
+    {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time + timedelta(hours=number), 'counted_as_upcoming': True}
+    for number, (venue_id, artist_id) in enumerate(zip(ids[Venue], ids[Artist]))
+  ])
+  db.session.commit()
+  return ids[Venue], ids[Artist]
+
+
+def batches(ids):
+  return [{'ids': ids[start:start + BATCH_SIZE]} for start in range(0, len(ids), BATCH_SIZE)]
+
+
+def run(client, counter, ids, repeat):
+  results = {}
+  requested = []
+
+  for name, method, path, data in read_routes(ids):
+    request_route(client, method, path, data) # Warm up
+    results[name] = measure(client, counter, method, [(path, data)] * repeat)
+    requested.append((method, path))
+
+  # The write routes work on rows the benchmark creates itself, deleting its venues again at the end
+  first = db.session.execute(text('SELECT coalesce(max(id), 0) + 1 FROM "Venue"')).scalar()
+  paths = [('/venues/create', venue_form(number)) for number in range(repeat)]
+  results['venue_create'] = measure(client, counter, 'POST', paths)
+  venue_ids = [row.id for row in Venue.query.with_entities(Venue.id).filter(Venue.id >= first, Venue.name.like('Benchmark Venue %')).order_by(Venue.id)]
+
+  first = db.session.execute(text('SELECT coalesce(max(id), 0) + 1 FROM "Artist"')).scalar()
+  paths = [('/artists/create', artist_form(number)) for number in range(repeat)]
+  results['artist_create'] = measure(client, counter, 'POST', paths)
+  artist_ids = [row.id for row in Artist.query.with_entities(Artist.id).filter(Artist.id >= first, Artist.name.like('Benchmark Artist %')).order_by(Artist.id)]
+  db.session.remove()
+
+  paths = [('/venues/%d/edit' % venue_id, venue_form(number)) for number, venue_id in enumerate(venue_ids)]
+  results['venue_edit'] = measure(client, counter, 'POST', paths)
+  paths = [('/artists/%d/edit' % artist_id, artist_form(number)) for number, artist_id in enumerate(artist_ids)]
+  results['artist_edit'] = measure(client, counter, 'POST', paths)
+
+  start_time = datetime.now() + timedelta(days=30)
+  paths = [('/shows/create', {
+    'venue_id': venue_id,
+    'artist_id': artist_id,
+    'start_time': (start_time + timedelta(hours=number)).strftime('%Y-%m-%d %H:%M:%S')
+  }) for number, (venue_id, artist_id) in enumerate(zip(venue_ids, artist_ids))]
+  results['show_create'] = measure(client, counter, 'POST', paths)
+
+  results['venue_delete'] = measure(client, counter, 'DELETE', [('/venues/%d' % venue_id, None) for venue_id in venue_ids])
+  results['artist_delete'] = measure(client, counter, 'DELETE', [('/artists/%d' % artist_id, None) for artist_id in artist_ids])
+
+  batch_venue_ids, batch_artist_ids = batch_rows(repeat * BATCH_SIZE)
+  db.session.remove()
+  results['api_venues_delete'] = measure(client, counter, 'DELETE', [('/api/v1/venues', batch) for batch in batches(batch_venue_ids)])
+  results['api_artists_delete'] = measure(client, counter, 'DELETE', [('/api/v1/artists', batch) for batch in batches(batch_artist_ids)])
+
+  requested += [('POST', '/venues/create'), ('POST', '/artists/create'), ('POST', '/venues/%d/edit' % ids['venue_id']),
+                ('POST', '/artists/%d/edit' % ids['artist_id']), ('POST', '/shows/create'), ('DELETE', '/venues/%d' % ids['venue_id']),
+                ('DELETE', '/artists/%d' % ids['artist_id']), ('DELETE', '/api/v1/venues'), ('DELETE', '/api/v1/artists')]
+  return results, requested
+
+
+def unvisited_routes(requested):
+  # Every rule and method in the url map that none of the requests above reached
+  adapter = app.url_map.bind('localhost')
+  visited = {(adapter.match(path.split('?')[0], method)[0], method) for method, path in requested}
+  missing = []
+  for rule in app.url_map.iter_rules():
+    if rule.endpoint in ('static', 'assets'):
+      continue
+    for method in rule.methods - {'HEAD', 'OPTIONS'}:
+      if (rule.endpoint, method) not in visited:
+        missing.append('%s %s' % (method, rule.rule))
+  return sorted(missing)
+
+
+def regressions(results, baseline, latency_tolerance, latency_floor, rows_tolerance, check_latency=False):
+  failures = []
+  for name, result in sorted(results.items()):
+    expected = baseline['routes'].get(name)
+    if expected is None:
+      failures.append('%s: not in the baseline' % name)
+      continue
+    if result['statements'] > expected['statements']:
+      failures.append('%s: %d statements, baseline %d' % (name, result['statements'], expected['statements']))
+    if result['rows'] > expected['rows'] * (1 + rows_tolerance):
+      failures.append('%s: %d rows fetched, baseline %d' % (name, result['rows'], expected['rows']))
+    # Medians are compared since the tails are mostly disk and scheduler noise, the floor keeps a few
+    # milliseconds of jitter on the fast routes from failing the run
+    if check_latency and result['p50_ms'] > expected['p50_ms'] * (1 + latency_tolerance) + latency_floor:
+      failures.append('%s: p50 %.1fms, baseline %.1fms' % (name, result['p50_ms'], expected['p50_ms']))
+  return failures
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark every route against a seeded synthetic dataset.')
+  parser.add_argument('--database-uri', required=True, help='scratch database to seed and benchmark against')
+  parser.add_argument('--venues', type=int, default=200)
+  parser.add_argument('--artists', type=int, default=500)
+  parser.add_argument('--shows', type=int, default=5000)
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--repeat', type=int, default=50, help='requests timed per route')
+  parser.add_argument('--no-seed', action='store_true', help='reuse the dataset seeded by a previous run')
+  parser.add_argument('--baseline', default=BASELINE)
+  parser.add_argument('--update-baseline', action='store_true', help='store this run as the new baseline')
+  parser.add_argument('--check-latency', action='store_true', help='also fail on p50 slowdowns, with a baseline from this machine')
+  parser.add_argument('--latency-tolerance', type=float, default=0.5, help='allowed p50 slowdown, 0.5 is 50%%')
+  parser.add_argument('--latency-floor', type=float, default=5, help='milliseconds of p50 slowdown always allowed')
+  parser.add_argument('--rows-tolerance', type=float, default=0.1, help='allowed growth in rows fetched')
+  args = parser.parse_args()
+
+  app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+  app.config['WTF_CSRF_ENABLED'] = False
+  app.config['EXPORT_TOKEN'] = EXPORT_TOKEN
+  app.config['DELETE_TOKEN'] = EXPORT_TOKEN
+  app.config['CACHE_TYPE'] = 'null'
+  app.extensions['response_cache'].init_app(app)
+  client = app.test_client()
+  dataset = {'venues': args.venues, 'artists': args.artists, 'shows': args.shows, 'seed': args.seed}
+
+  with app.app_context():
+    if not args.no_seed:
+      start = time.perf_counter()
+      generate(**dataset)
+      print('seeded %(venues)d venues, %(artists)d artists and %(shows)d shows' % dataset + ' in %.1fs' % (time.perf_counter() - start))
+
+    # Venue and artist 1 carry the most shows in the generated data
+    ids = {'venue_id': 1, 'artist_id': 1}
+    counter = StatementCounter()
+    event.listen(db.engine, 'after_cursor_execute', counter)
+    try:
+      results, requested = run(client, counter, ids, args.repeat)
+    finally:
+      event.remove(db.engine, 'after_cursor_execute', counter)
+
+  print('%-22s %10s %10s %10s %11s %8s' % ('', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'statements', 'rows'))
+  for name, result in results.items():
+    print('%-22s %10.1f %10.1f %10.1f %11d %8d' % (name, result['p50_ms'], result['p95_ms'], result['p99_ms'], result['statements'], result['rows']))
+
+  missing = unvisited_routes(requested)
+  if missing:
+    print('routes without a benchmark: %s' % ', '.join(missing))
+    sys.exit(1)
+
+  if args.update_baseline:
+    with open(args.baseline, 'w') as baseline_file:
+      json.dump({'dataset': dataset, 'routes': results}, baseline_file, indent=2, sort_keys=True)
+      baseline_file.write('\n')
+    print('baseline written to %s' % args.baseline)
+    return
+
+  with open(args.baseline) as baseline_file:
+    baseline = json.load(baseline_file)
+  if baseline['dataset'] != dataset:
+    sys.exit('the baseline was recorded with %s, run with the same dataset or --update-baseline' % baseline['dataset'])
+
+  failures = regressions(results, baseline, args.latency_tolerance, args.latency_floor, args.rows_tolerance, args.check_latency)
+  for failure in failures:
+    print('REGRESSION ' + failure)
+  if failures:
+    sys.exit(1)
+  print('no regressions against %s' % args.baseline)
+
+
+if __name__ == '__main__':
+  main()
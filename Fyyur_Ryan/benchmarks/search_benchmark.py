@@ -0,0 +1,88 @@
+#----------------------------------------------------------------------------#
+# Search benchmark.
+#
+# Seeds the Artist table with synthetic rows and times /artists/search with the
+# trigram index in use and with index scans switched off (the old sequential
+# scan behaviour). Run it against a scratch database, never the real one:
+#
+#   python benchmarks/search_benchmark.py --database-uri postgresql://localhost:5432/fyyur_bench --rows 1000000
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import event, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db
+
+app = create_app()
+
+TERMS = ['a1b2', 'ff0', 'c0ffee', 'zz', 'artist 9']
+
+
+def seed(rows):
+  # Bulk insert the synthetic artists in SQL so seeding a million rows takes seconds rather than minutes
+  db.session.execute(text('''
+    INSERT INTO "Artist" (name, city, state, genres, looking_venues)
+    SELECT 'Artist ' || i || ' ' || substr(md5(i::text), 1, 12), 'New York', 'NY', ARRAY['Jazz'], false
+    FROM generate_series(1, :rows) AS i
+  '''), {'rows': rows})
+  db.session.commit()
+  db.session.execute(text('ANALYZE "Artist"'))
+  db.session.commit()
+
+
+def time_searches(client, repeat):
+  timings = []
+  for _ in range(repeat):
+    for term in TERMS:
+      start = time.perf_counter()
+      client.get('/artists/search', query_string={'search_term': term})
+      timings.append(time.perf_counter() - start)
+  timings.sort()
+  return timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+def disable_index_scans(conn):
+  conn.exec_driver_sql('SET LOCAL enable_bitmapscan = off')
+  conn.exec_driver_sql('SET LOCAL enable_indexscan = off')
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the trigram backed artist search.')
+  parser.add_argument('--database-uri', required=True, help='scratch database to seed and benchmark against')
+  parser.add_argument('--rows', type=int, default=1000000)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--no-seed', action='store_true', help='reuse rows seeded by a previous run')
+  args = parser.parse_args()
+
+  app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+  client = app.test_client()
+
+  with app.app_context():
+    if not args.no_seed:
+      start = time.perf_counter()
+      seed(args.rows)
+      print('seeded %d artists in %.1fs' % (args.rows, time.perf_counter() - start))
+
+    indexed = time_searches(client, args.repeat)
+
+    event.listen(db.engine, 'begin', disable_index_scans)
+    try:
+      scanned = time_searches(client, args.repeat)
+    finally:
+      event.remove(db.engine, 'begin', disable_index_scans)
+
+  print('%-22s %10s %10s' % ('', 'p50 (ms)', 'p95 (ms)'))
+  print('%-22s %10.1f %10.1f' % ('sequential scan', scanned[0] * 1000, scanned[1] * 1000))
+  print('%-22s %10.1f %10.1f' % ('trigram index', indexed[0] * 1000, indexed[1] * 1000))
+  print('speedup (p50): %.1fx' % (scanned[0] / indexed[0]))
+
+
+if __name__ == '__main__':
+  main()
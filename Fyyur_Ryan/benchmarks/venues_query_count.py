@@ -0,0 +1,74 @@
+#----------------------------------------------------------------------------#
+# Venue listing query count.
+#
+# Calls /venues through the Flask test client against a seeded database and
+# counts the statements the page runs. It takes the same number however many
+# areas and venues there are: the validator behind the ETag, the grouped
+# query returning every venue with its area and upcoming show count, and the
+# genre counts. A query per area or per venue fails the run.
+#
+#   python benchmarks/venues_query_count.py --database-uri postgresql://localhost:5432/fyyur_bench
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Venue
+
+app = create_app()
+
+EXPECTED_STATEMENTS = 3
+# The plain listing and one filtered on a genre, which goes through the same queries
+PATHS = ['/venues', '/venues?genre=Jazz']
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Fail if the venue listing runs more than %d statements.' % EXPECTED_STATEMENTS)
+  parser.add_argument('--database-uri', required=True, help='seeded database to run the page against')
+  args = parser.parse_args()
+
+  app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+  # Every request has to reach the database, a cached page would run no statement at all
+  app.config['CACHE_TYPE'] = 'null'
+  app.extensions['response_cache'].init_app(app)
+  client = app.test_client()
+  statements = []
+
+  def count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+  with app.app_context():
+    # With a single area one query per area and one for all of them look the same
+    areas = db.session.query(Venue.city, Venue.state).distinct().limit(2).count()
+    if areas < 2:
+      sys.exit('the database needs venues in at least two cities')
+
+    failures = 0
+    # Listened to on every engine so the statements sent to a replica are counted too
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+      for path in PATHS:
+        del statements[:]
+        response = client.get(path)
+        response.get_data()
+        ok = response.status_code == 200 and len(statements) == EXPECTED_STATEMENTS
+        print('%-6s %-20s %d statements, expected %d' % ('ok' if ok else 'FAIL', path, len(statements), EXPECTED_STATEMENTS))
+        if not ok:
+          for statement in statements:
+            print('         ' + ' '.join(statement.split())[:100])
+        failures += not ok
+    finally:
+      event.remove(Engine, 'before_cursor_execute', count)
+
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+  main()
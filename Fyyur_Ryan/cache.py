@@ -0,0 +1,171 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session
+
+#----------------------------------------------------------------------------#
+# Response cache.
+#
+# Rendered read pages are cached under a key per route and entity, such as
+# 'venues' or 'venue:3'. Every key has a version number that is part of the
+# stored entry's name, so invalidating a key bumps its version and all the
+# cached variants of that page (every cursor page of /artists, say) stop being
+# served at once. Old entries then age out through the TTL or the LRU.
+#----------------------------------------------------------------------------#
+
+
+class NullCache(object):
+  '''Caches nothing, used when CACHE_TYPE is 'null'.'''
+
+  def get(self, key):
+    return None
+
+  def set(self, key, value, ttl):
+    pass
+
+  def version(self, name):
+    return 0
+
+  def bump(self, name):
+    pass
+
+
+class LRUCache(object):
+  '''
+  In-process cache holding at most max_entries responses, least recently used evicted first.
+  Each worker process has its own copy, so with several workers use the Redis backend to have
+  invalidations seen by all of them.
+  '''
+
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._versions = {} # Never evicted, a version that went back to 0 could revive stale entries
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      value, expires = entry
+      if expires < time.monotonic():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl):
+    with self._lock:
+      self._entries[key] = (value, time.monotonic() + ttl)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def version(self, name):
+    with self._lock:
+      return self._versions.setdefault(name, 0)
+
+  def bump(self, name):
+    with self._lock:
+      self._versions[name] = self._versions.get(name, 0) + 1
+
+
+class RedisCache(object):
+  '''Cache shared by every worker through Redis (or anything speaking its protocol), entries expire with SET EX.'''
+
+  def __init__(self, url, prefix='fyyur:'):
+    # Only needed for this backend, so it is not imported unless it is configured
+    import redis
+    self._redis = redis.Redis.from_url(url)
+    self.prefix = prefix
+
+  def get(self, key):
+    return self._redis.get(self.prefix + key)
+
+  def set(self, key, value, ttl):
+    self._redis.set(self.prefix + key, value, ex=ttl)
+
+  def version(self, name):
+    # A missing version starts from the current time rather than 0 so that a version key evicted
+    # by Redis never makes old entries reachable again
+    key = self.prefix + 'version:' + name
+    pipeline = self._redis.pipeline()
+    pipeline.set(key, int(time.time() * 1000), nx=True)
+    pipeline.get(key)
+    return int(pipeline.execute()[1])
+
+  def bump(self, name):
+    self._redis.incr(self.prefix + 'version:' + name)
+
+
+class ResponseCache(object):
+  '''
+  Flask extension caching the body of GET responses. Configured with CACHE_TYPE ('lru', 'redis' or 'null'),
+  CACHE_DEFAULT_TTL, CACHE_MAX_ENTRIES and CACHE_REDIS_URL.
+  '''
+
+  def __init__(self, app=None):
+    self.backend = NullCache()
+    self.default_ttl = 300
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    cache_type = app.config.get('CACHE_TYPE', 'lru')
+    if cache_type == 'lru':
+      self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+    elif cache_type == 'redis':
+      self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+    elif cache_type == 'null':
+      self.backend = NullCache()
+    else:
+      raise ValueError('Unknown CACHE_TYPE: %s' % cache_type)
+    self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+    app.extensions['response_cache'] = self
+
+  def cached(self, key, ttl=None):
+    '''
+    Decorator caching a view under key, formatted with the view arguments ('venue:{venue_id}').
+    The query string is part of the entry so every page of a listing is cached separately.
+    '''
+    def decorator(view):
+      # Async views (the ASGI read paths) get the same caching around an awaited view
+      if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+          entry = self._entry(key, kwargs)
+          body = self.backend.get(entry) if entry else None
+          if body is None:
+            body = await view(*args, **kwargs)
+            self._store(entry, body, ttl)
+          return body
+        return async_wrapper
+
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        entry = self._entry(key, kwargs)
+        body = self.backend.get(entry) if entry else None
+        if body is None:
+          body = view(*args, **kwargs)
+          self._store(entry, body, ttl)
+        return body
+      return wrapper
+    return decorator
+
+  def _entry(self, key, kwargs):
+    # Pages carrying flashed messages are one-off and are rendered fresh
+    if request.method != 'GET' or session.get('_flashes'):
+      return None
+    name = key.format(**kwargs)
+    return '%s:%d:%s' % (name, self.backend.version(name), request.full_path)
+
+  def _store(self, entry, body, ttl):
+    if entry and isinstance(body, str):
+      self.backend.set(entry, body, ttl or self.default_ttl)
+
+  def invalidate(self, *keys):
+    for key in keys:
+      self.backend.bump(key)
@@ -0,0 +1,28 @@
+#----------------------------------------------------------------------------#
+# Choices.
+#
+# The fixed values the forms offer, here rather than in forms.py so the pages
+# filtering on them do not have to load Flask-WTF.
+#----------------------------------------------------------------------------#
+
+GENRES = [
+  'Alternative',
+  'Blues',
+  'Classical',
+  'Country',
+  'Electronic',
+  'Folk',
+  'Funk',
+  'Hip-Hop',
+  'Heavy Metal',
+  'Instrumental',
+  'Jazz',
+  'Musical Theatre',
+  'Pop',
+  'Punk',
+  'R&B',
+  'Reggae',
+  'Rock n Roll',
+  'Soul',
+  'Other',
+]
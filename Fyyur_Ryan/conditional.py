@@ -0,0 +1,69 @@
+import hashlib
+import inspect
+from functools import wraps
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#
+# Pages wrapped in @conditional(validator) run the validator query from
+# queries.py before anything else. Its row becomes a weak ETag and its
+# last_modified, when it has one, the Last-Modified header. A request whose
+# If-None-Match or If-Modified-Since still matches gets a bodiless 304
+# without the page being fetched or rendered. Responses carry CONDITIONAL_CACHE_CONTROL so
+# browsers and crawlers come back with those headers.
+#----------------------------------------------------------------------------#
+
+
+def _validators(row):
+  etag = hashlib.sha1(repr(tuple(row)).encode()).hexdigest()[:20]
+  # Validators without a last_modified column are only compared through If-None-Match
+  return etag, row._mapping.get('last_modified')
+
+
+def _respond(body, etag, last_modified):
+  response = make_response(body)
+  response.set_etag(etag, weak=True)
+  if last_modified is not None:
+    response.last_modified = last_modified
+  response.headers['Cache-Control'] = current_app.config['CONDITIONAL_CACHE_CONTROL']
+  return response
+
+
+def _checked(row):
+  # Returns the validators, or None when the page has to be rendered without them: flashed messages make
+  # the page one-off, and a missing row means the entity does not exist
+  if request.method != 'GET' or session.get('_flashes') or row is None:
+    return None
+  return _validators(row)
+
+
+def conditional(validator, fetch=None):
+  '''
+  Decorator answering conditional GETs from validator(**view_args), a query returning one row, with a
+  last_modified column for Last-Modified. Async views pass fetch, a coroutine function running the query
+  and returning its first row.
+  '''
+  def decorator(view):
+    if inspect.iscoroutinefunction(view):
+      @wraps(view)
+      async def async_wrapper(*args, **kwargs):
+        validators = _checked(await fetch(validator(**kwargs)))
+        if validators is None:
+          return await view(*args, **kwargs)
+        if not is_resource_modified(request.environ, etag=validators[0], last_modified=validators[1]):
+          return _respond(('', 304), *validators)
+        return _respond(await view(*args, **kwargs), *validators)
+      return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      validators = _checked(validator(**kwargs).first())
+      if validators is None:
+        return view(*args, **kwargs)
+      if not is_resource_modified(request.environ, etag=validators[0], last_modified=validators[1]):
+        return _respond(('', 304), *validators)
+      return _respond(view(*args, **kwargs), *validators)
+    return wrapper
+  return decorator
@@ -0,0 +1,77 @@
+from itertools import chain, islice
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, Show, Venue, Artist
+from extensions import cache, typeahead
+from matviews import refresh_after_write
+from shows import uncount_shows
+
+#----------------------------------------------------------------------------#
+# Deletes.
+#
+#   flask delete venues 12 40 41
+#   flask delete artists --file ids.txt          one id per line, - for stdin
+#   curl -X DELETE -H 'Authorization: Bearer <DELETE_TOKEN>' \
+#        -H 'Content-Type: application/json' -d '{"ids": [12, 40]}' /api/v1/venues
+#
+# Venues and artists are deleted by id, any number at a time, with their
+# shows. The shows go through the foreign keys' ON DELETE CASCADE, so none of
+# them are loaded. A batch takes four statements: lock the rows, list the
+# pages showing them, take their shows off the counters and delete them.
+#----------------------------------------------------------------------------#
+
+# Each kind's model, the show column pointing at it and the one pointing at the other kind, whose pages list the shows
+KINDS = {
+  'venues': (Venue, Show.venue_id, Show.artist_id, 'venue:%d', 'artist:%d'),
+  'artists': (Artist, Show.artist_id, Show.venue_id, 'artist:%d', 'venue:%d'),
+}
+
+
+def delete_rows(kind, ids):
+  '''Deletes the 'venues' or 'artists' with the ids and their shows, in one transaction. Returns the ids found.'''
+  model, key, other_key, page, other_page = KINDS[kind]
+
+  # Locked in id order so concurrent batches do not deadlock. A show being booked on one of them waits for the
+  # lock in its foreign key check and fails once the row is gone, so every deleted show is taken off the counters
+  ids = [row.id for row in db.session.query(model.id).filter(model.id.in_(set(ids))).order_by(model.id).with_for_update()]
+  if not ids:
+    db.session.rollback()
+    return ids
+
+  # The pages of the other kind listing their shows, worked out before the shows are gone
+  others = db.session.query(other_key).filter(key.in_(ids)).distinct()
+  cache_keys = ['venues', 'artists', 'shows'] + [page % row_id for row_id in ids] + [other_page % row[0] for row in others]
+
+  uncount_shows(key.in_(ids))
+  model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+  db.session.commit()
+
+  refresh_after_write('venue_areas', 'upcoming_shows')
+  cache.invalidate(*cache_keys)
+  for row_id in ids:
+    typeahead.remove(kind, row_id)
+  return ids
+
+
+def _read_ids(lines):
+  for line in lines:
+    if line.strip():
+      yield int(line)
+
+
+@click.command('delete')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--file', 'ids_file', type=click.File('r'), help='File of ids to delete as well, one per line, - for standard input.')
+@click.option('--batch-size', default=1000, show_default=True, help='Ids deleted per transaction.')
+@with_appcontext
+def delete_command(kind, ids, ids_file, batch_size):
+  """Deletes venues or artists, with their shows, by id."""
+  ids = chain(ids, _read_ids(ids_file) if ids_file is not None else [])
+  deleted = 0
+  # Batched so a long list does not hold its locks, and the counters' rows, in one long transaction
+  for batch in iter(lambda: list(islice(ids, batch_size)), []):
+    deleted += len(delete_rows(kind, batch))
+  print('%d %s deleted' % (deleted, kind))
@@ -0,0 +1,197 @@
+import csv
+import io
+import sys
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask import Blueprint, Response, abort, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import ARRAY, Boolean, DateTime, Float, Integer
+
+from auth import require_bearer_token
+from models import db, Show, Venue, Artist
+from queries import VENUE_FIELDS, ARTIST_FIELDS, venues_query, artists_query, shows_query
+
+#----------------------------------------------------------------------------#
+# Catalogue export.
+#
+#   flask export shows --format parquet --output shows.parquet
+#   curl -H 'Authorization: Bearer <EXPORT_TOKEN>' /exports/venues.csv
+#
+# Tables are read through a server-side cursor in batches and written out one
+# batch at a time as CSV or Parquet (a row group per batch), so memory stays
+# flat however large the table is. Parquet needs pyarrow installed, without
+# it the .parquet downloads are 404s.
+#----------------------------------------------------------------------------#
+
+exports = Blueprint('exports', __name__, url_prefix='/exports')
+
+# Raw Show rows, the other exports reuse the API field lists
+SHOW_TABLE_FIELDS = {
+  'id': Show.id,
+  'start_time': Show.start_time,
+  'venue_id': Show.venue_id,
+  'artist_id': Show.artist_id,
+}
+
+# The joined listing the /shows page builds
+SHOW_LISTING = ['venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time']
+
+TABLES = ['venues', 'artists', 'shows', 'show_listing']
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def _export_query(table):
+  # Returns the query ordered by its keyset and the names of the columns it exports
+  if table == 'venues':
+    return venues_query(VENUE_FIELDS).order_by(Venue.id), list(VENUE_FIELDS)
+  if table == 'artists':
+    return artists_query(ARTIST_FIELDS).order_by(Artist.id), list(ARTIST_FIELDS)
+  if table == 'shows':
+    columns = [column.label(name) for name, column in SHOW_TABLE_FIELDS.items()]
+    return db.session.query(*columns).order_by(Show.id), list(SHOW_TABLE_FIELDS)
+  if table == 'show_listing':
+    return shows_query(SHOW_LISTING, start=datetime.now()).order_by(Show.start_time, Show.id), SHOW_LISTING
+  raise KeyError(table)
+
+
+def _batches(query, batch_size):
+  rows = iter(query.execution_options(stream_results=True).yield_per(batch_size))
+  while True:
+    batch = list(islice(rows, batch_size))
+    if not batch:
+      return
+    yield batch
+
+
+def _csv_chunks(query, names, batch_size):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(names)
+  for batch in _batches(query, batch_size):
+    for row in batch:
+      values = [getattr(row, name) for name in names]
+      writer.writerow([','.join(value) if isinstance(value, list) else value for value in values])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+  if buffer.tell():
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+  '''Write-only file handing each write over to the caller while keeping Parquet's byte offsets right.'''
+
+  def __init__(self):
+    self.chunks = []
+    self.position = 0
+
+  def writable(self):
+    return True
+
+  def write(self, data):
+    self.chunks.append(bytes(data))
+    self.position += len(data)
+    return len(data)
+
+  def tell(self):
+    return self.position
+
+  def drain(self):
+    data = b''.join(self.chunks)
+    self.chunks = []
+    return data
+
+
+def _arrow_schema(query, names):
+  import pyarrow
+
+  types = {}
+  for description in query.column_descriptions:
+    column_type = description['type']
+    if isinstance(column_type, ARRAY):
+      types[description['name']] = pyarrow.list_(pyarrow.string())
+    elif isinstance(column_type, Boolean):
+      types[description['name']] = pyarrow.bool_()
+    elif isinstance(column_type, Integer):
+      types[description['name']] = pyarrow.int64()
+    elif isinstance(column_type, Float):
+      types[description['name']] = pyarrow.float64()
+    elif isinstance(column_type, DateTime):
+      types[description['name']] = pyarrow.timestamp('us')
+    else:
+      types[description['name']] = pyarrow.string()
+  return pyarrow.schema([(name, types[name]) for name in names])
+
+
+def _parquet_chunks(query, names, batch_size):
+  # Only needed for Parquet exports, so it is not imported unless one is asked for
+  import pyarrow
+  import pyarrow.parquet
+
+  schema = _arrow_schema(query, names)
+  sink = _ChunkSink()
+  writer = pyarrow.parquet.ParquetWriter(sink, schema)
+  for batch in _batches(query, batch_size):
+    columns = [[getattr(row, name) for row in batch] for name in names]
+    writer.write_table(pyarrow.Table.from_arrays([pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+    yield sink.drain()
+  writer.close()
+  yield sink.drain()
+
+
+def available_formats():
+  # Parquet is only offered with pyarrow installed
+  try:
+    import pyarrow.parquet
+  except ImportError:
+    return [format for format in FORMATS if format != 'parquet']
+  return list(FORMATS)
+
+
+def export_chunks(table, format, batch_size=1000):
+  '''Yields the table as chunks of CSV text or Parquet bytes, one chunk per batch of rows.'''
+  query, names = _export_query(table)
+  if format == 'parquet':
+    return _parquet_chunks(query, names, batch_size)
+  return _csv_chunks(query, names, batch_size)
+
+
+@exports.route('/<table>.<format>')
+@db.replica_reads
+def download(table, format):
+  # Only served when EXPORT_TOKEN is configured and sent back as a bearer token
+  require_bearer_token('EXPORT_TOKEN')
+  # Checked before the response starts, the stream cannot turn into an error once it has
+  if table not in TABLES or format not in available_formats():
+    abort(404)
+
+  return Response(
+    stream_with_context(export_chunks(table, format)),
+    mimetype=FORMATS[format],
+    headers={'Content-Disposition': 'attachment; filename=%s.%s' % (table, format)}
+  )
+
+
+@click.command('export')
+@click.argument('table', type=click.Choice(TABLES))
+@click.option('--format', 'format', type=click.Choice(list(FORMATS)), default='csv', show_default=True)
+@click.option('--output', '-o', default='-', help='File to write, standard output by default.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched from the cursor per chunk.')
+@with_appcontext
+def export_command(table, format, output, batch_size):
+  """Streams a table, or the upcoming show listing, out as CSV or Parquet."""
+  if format not in available_formats():
+    raise click.UsageError('%s exports need pyarrow installed' % format)
+  binary = format == 'parquet'
+  if output == '-':
+    destination = sys.stdout.buffer if binary else sys.stdout
+  else:
+    destination = open(output, 'wb' if binary else 'w', newline=None if binary else '')
+  try:
+    for chunk in export_chunks(table, format, batch_size):
+      destination.write(chunk)
+  finally:
+    if output != '-':
+      destination.close()
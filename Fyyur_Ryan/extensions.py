@@ -0,0 +1,17 @@
+from assets import Assets
+from cache import ResponseCache
+from instrumentation import QueryStats
+from typeahead import Typeahead
+
+#----------------------------------------------------------------------------#
+# Extensions.
+#
+# Created unbound so the blueprints can use them (@cache.cached, say) before
+# create_app() binds them to the app with init_app(). The database extension
+# lives with the models in models.py.
+#----------------------------------------------------------------------------#
+
+cache = ResponseCache()
+query_stats = QueryStats()
+assets = Assets()
+typeahead = Typeahead()
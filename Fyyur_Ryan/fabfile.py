@@ -1,3 +1,5 @@
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
@@ -5,14 +7,30 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    # The repo's required checks, run by prepare and deploy. Against a scratch database, which gets reseeded:
+    # the route benchmark's statement and row counts, the query plans and the venue listing's statement count
+    # (a page going back to a query per area or venue fails there). Then that a worker boots without the
+    # modules it loads on first use. Latencies recorded on another machine say nothing here, both benchmarks
+    # only compare them with --check-latency
+    database_uri = os.environ.get("BENCH_DATABASE_URI")
+    if not database_uri:
+        abort("Set BENCH_DATABASE_URI to a scratch database to run the benchmarks against.")
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python benchmarks/route_benchmark.py --database-uri '{0}'"
+            " && python benchmarks/query_plan_check.py --database-uri '{0}'"
+            " && python benchmarks/venues_query_count.py --database-uri '{0}'"
+            " && python benchmarks/import_time.py".format(database_uri)
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def assets():
+    # Rebuilds the fingerprinted bundles in static/dist so they go out with the commit
+    local("flask build-assets")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -24,6 +42,7 @@ def push():
 
 def prepare():
     test()
+    assets()
     commit()
     push()
 
@@ -47,6 +66,7 @@ def heroku_test():
 def deploy():
     pull()
     test()
+    assets()
     commit()
     heroku()
     heroku_test()
@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Filters.
+#
+# Babel and dateutil are imported on first use, a worker that has not
+# rendered a date yet does not pay for loading them.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # Compiling a Babel pattern and loading its locale data only has to happen once per format and locale
+  import babel
+  import babel.dates
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+@lru_cache(maxsize=4096)
+def format_datetime(value, format='medium', locale='en'):
+  # Controllers hand over datetime objects, strings are still parsed for older callers.
+  # Many tiles share a start time, so recently formatted timestamps are kept in the LRU
+  if isinstance(value, str):
+    import dateutil.parser
+    value = dateutil.parser.parse(value)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
@@ -1,7 +1,24 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, InputRequired, AnyOf, URL, NumberRange
+from choices import GENRES
+
+class StartTimeField(DateTimeField):
+    # Takes the start time with or without seconds, as typed into the form or sent by the browser's picker
+    formats = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M')
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            value = ' '.join(valuelist).strip()
+            for format in self.formats:
+                try:
+                    self.data = datetime.strptime(value, format)
+                    return
+                except ValueError:
+                    pass
+            self.data = None
+            raise ValueError(self.gettext('Not a valid date and time, use YYYY-MM-DD HH:MM.'))
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -10,11 +27,17 @@ class ShowForm(Form):
     venue_id = StringField(
         'venue_id'
     )
-    start_time = DateTimeField(
+    start_time = StartTimeField(
         'start_time',
-        validators=[DataRequired()],
+        validators=[InputRequired()],
         default= datetime.today()
     )
+    # Minutes the venue and the artist are booked for from the start time
+    duration = IntegerField(
+        'duration',
+        validators=[NumberRange(min=1, max=24 * 60)],
+        default=120
+    )
 
 class VenueForm(Form):
     name = StringField(
@@ -91,27 +114,7 @@ class VenueForm(Form):
     genres = SelectMultipleField(
         # TODO implement enum restriction
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=[(genre, genre) for genre in GENRES]
     )
     facebook_link = StringField(
         'facebook_link', validators=[URL()]
@@ -200,27 +203,7 @@ class ArtistForm(Form):
     )
     genres = SelectMultipleField(
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=[(genre, genre) for genre in GENRES]
      )
     facebook_link = StringField(
         # TODO implement enum restriction
@@ -0,0 +1,279 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+
+from models import db, Show, Venue, Artist
+from extensions import cache
+from matviews import refresh_after_write
+from shows import EXCLUSION_VIOLATION
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+#   flask import venues venues.csv
+#   flask import shows lineup.ndjson --batch-size 5000
+#
+# Rows are read from CSV (a header row with the form field names), NDJSON or
+# a JSON array, checked with the same form as the create pages and inserted
+# in batches with one multi-row INSERT per batch. Shows reference their venue
+# and artist by venue_id/artist_id or by venue_name/artist_name, and may give
+# a duration in minutes. Shows overlapping a booking of their venue or artist
+# are rejected like invalid rows.
+#----------------------------------------------------------------------------#
+
+
+def _read_rows(path):
+  # Yields (line, row) pairs without loading CSV or NDJSON files into memory
+  with open(path, newline='') as source:
+    if path.endswith('.csv'):
+      reader = csv.DictReader(source)
+      for row in reader:
+        yield reader.line_num, row
+    elif path.endswith(('.ndjson', '.jsonl')):
+      for line, text in enumerate(source, 1):
+        if text.strip():
+          yield line, json.loads(text)
+    else:
+      for line, row in enumerate(json.load(source), 1):
+        yield line, row
+
+
+def _formdata(row):
+  # Genres may come as a list (JSON) or a comma separated string (CSV), booleans as true/false/yes/no/1/0
+  formdata = MultiDict()
+  for field, value in row.items():
+    if value is None or value == '':
+      continue
+    if field == 'genres':
+      for genre in (value if isinstance(value, list) else value.split(',')):
+        formdata.add(field, genre.strip())
+    elif field in ('seeking_talent', 'seeking_venue'):
+      if value is True or str(value).lower() in ('true', 'yes', 'y', '1'):
+        formdata.add(field, 'y')
+    else:
+      formdata.add(field, str(value))
+  return formdata
+
+
+def _validate(form_class, row):
+  form = form_class(formdata=_formdata(row), meta={'csrf': False})
+  return form, form.validate()
+
+
+def _venue_values(form):
+  return {
+    'name': form.name.data,
+    'city': form.city.data,
+    'state': form.state.data,
+    'address': form.address.data,
+    'phone': form.phone.data,
+    'image_link': form.image_link.data,
+    'facebook_link': form.facebook_link.data,
+    'genres': form.genres.data,
+    'website_link': form.website_link.data,
+    'looking_talent': form.seeking_talent.data,
+    'seeking_description': form.seeking_description.data
+  }
+
+
+def _artist_values(form):
+  return {
+    'name': form.name.data,
+    'city': form.city.data,
+    'state': form.state.data,
+    'phone': form.phone.data,
+    'genres': form.genres.data,
+    'image_link': form.image_link.data,
+    'facebook_link': form.facebook_link.data,
+    'website_link': form.website_link.data,
+    'looking_venues': form.seeking_venue.data,
+    'seeking_description': form.seeking_description.data
+  }
+
+
+def _ids_by_name(model, names):
+  # One query per batch resolving names to ids, names shared by several rows are left out as ambiguous
+  found = {}
+  ambiguous = set()
+  for row in model.query.with_entities(model.id, model.name).filter(model.name.in_(names)):
+    if row.name in found:
+      ambiguous.add(row.name)
+    found[row.name] = row.id
+  return {name: model_id for name, model_id in found.items() if name not in ambiguous}
+
+
+def _resolve_shows(batch):
+  # Fills in venue_id/artist_id from venue_name/artist_name and checks that every referenced id exists
+  venue_ids = _ids_by_name(Venue, {row['venue_name'] for line, row in batch if not row.get('venue_id') and row.get('venue_name')})
+  artist_ids = _ids_by_name(Artist, {row['artist_name'] for line, row in batch if not row.get('artist_id') and row.get('artist_name')})
+  for line, row in batch:
+    if not row.get('venue_id') and row.get('venue_name') in venue_ids:
+      row['venue_id'] = venue_ids[row['venue_name']]
+    if not row.get('artist_id') and row.get('artist_name') in artist_ids:
+      row['artist_id'] = artist_ids[row['artist_name']]
+
+  referenced_venues = {int(row['venue_id']) for line, row in batch if str(row.get('venue_id', '')).isdigit()}
+  referenced_artists = {int(row['artist_id']) for line, row in batch if str(row.get('artist_id', '')).isdigit()}
+  existing_venues = {row.id for row in Venue.query.with_entities(Venue.id).filter(Venue.id.in_(referenced_venues))}
+  existing_artists = {row.id for row in Artist.query.with_entities(Artist.id).filter(Artist.id.in_(referenced_artists))}
+
+  for line, row in batch:
+    errors = {}
+    if not str(row.get('venue_id', '')).isdigit() or int(row['venue_id']) not in existing_venues:
+      errors['venue_id'] = ['No single venue matches %s' % (row.get('venue_id') or row.get('venue_name'))]
+    if not str(row.get('artist_id', '')).isdigit() or int(row['artist_id']) not in existing_artists:
+      errors['artist_id'] = ['No single artist matches %s' % (row.get('artist_id') or row.get('artist_name'))]
+    yield line, row, errors
+
+
+def _count_shows(values):
+  # Adds the imported shows to their venue's and artist's counters, one executemany UPDATE per table
+  for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+    counts = Counter((show[key], show['counted_as_upcoming']) for show in values)
+    params = [{
+      'model_id': model_id,
+      'upcoming': counts[(model_id, True)],
+      'past': counts[(model_id, False)]
+    } for model_id in {model_id for model_id, upcoming in counts}]
+    db.session.execute(
+      model.__table__.update().where(model.__table__.c.id == bindparam('model_id')).values(
+        upcoming_shows_count=model.__table__.c.upcoming_shows_count + bindparam('upcoming'),
+        past_shows_count=model.__table__.c.past_shows_count + bindparam('past')
+      ),
+      params
+    )
+
+
+def _insert_show_rows(values):
+  # The inserted rows, each in a savepoint so a clash raised by the booking trigger only undoes this INSERT
+  table = Show.__table__
+  with db.session.begin_nested():
+    return db.session.execute(
+      insert(table).values(values).on_conflict_do_nothing().returning(table.c.venue_id, table.c.artist_id, table.c.start_time)
+    ).all()
+
+
+def _insert_shows(lines, values):
+  # One multi-row INSERT. ON CONFLICT DO NOTHING covers the exclusion constraints, so a show clashing with a
+  # booking, made earlier or by a previous row of the batch, is skipped instead of failing the whole batch.
+  # It does not cover the trigger checking shows that cross into the next month's partition, which raises the
+  # clash itself, so then the batch is inserted again one row at a time. The RETURNING rows tell which went in,
+  # every other row is reported back as rejected
+  try:
+    inserted_rows = _insert_show_rows(values)
+  except IntegrityError as error:
+    if getattr(error.orig, 'pgcode', None) != EXCLUSION_VIOLATION:
+      raise
+    inserted_rows = []
+    for show in values:
+      try:
+        inserted_rows += _insert_show_rows([show])
+      except IntegrityError as error:
+        if getattr(error.orig, 'pgcode', None) != EXCLUSION_VIOLATION:
+          raise
+  returned = Counter(tuple(row) for row in inserted_rows)
+  inserted = []
+  rejected = []
+  for line, show in zip(lines, values):
+    key = (show['venue_id'], show['artist_id'], show['start_time'])
+    if returned[key]:
+      returned[key] -= 1
+      inserted.append(show)
+    else:
+      rejected.append((line, {'start_time': ['The venue or the artist is already booked at that time']}))
+  return inserted, rejected
+
+
+def _import_batch(kind, batch):
+  '''Validates and inserts one batch in a single transaction. Returns the number of rows inserted and the rejected rows.'''
+  from forms import VenueForm, ArtistForm, ShowForm # Loaded on first use like the pages' forms, not with every command
+  rejected = []
+  values = []
+  lines = []
+
+  if kind == 'shows':
+    rows = _resolve_shows(batch)
+  else:
+    rows = ((line, row, {}) for line, row in batch)
+
+  for line, row, errors in rows:
+    form, valid = _validate({'venues': VenueForm, 'artists': ArtistForm, 'shows': ShowForm}[kind], row)
+    errors = dict(form.errors, **errors)
+    if errors:
+      rejected.append((line, errors))
+    elif kind == 'venues':
+      values.append(_venue_values(form))
+    elif kind == 'artists':
+      values.append(_artist_values(form))
+    else:
+      values.append({
+        'venue_id': int(row['venue_id']),
+        'artist_id': int(row['artist_id']),
+        'start_time': form.start_time.data,
+        'duration': timedelta(minutes=form.duration.data),
+        'counted_as_upcoming': form.start_time.data > datetime.now()
+      })
+      lines.append(line)
+
+  if kind == 'shows' and values:
+    values, clashes = _insert_shows(lines, values)
+    rejected = sorted(rejected + clashes, key=lambda rejection: rejection[0])
+    if values:
+      _count_shows(values)
+    db.session.commit()
+  elif values:
+    model = {'venues': Venue, 'artists': Artist}[kind]
+    db.session.execute(model.__table__.insert(), values)
+    db.session.commit()
+
+  if values:
+    if kind == 'shows':
+      keys = {'shows', 'venues'} | {'venue:%d' % show['venue_id'] for show in values} | {'artist:%d' % show['artist_id'] for show in values}
+    else:
+      keys = {kind}
+    cache.invalidate(*keys)
+
+  return len(values), rejected
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True, help='Rows validated and inserted per transaction.')
+@with_appcontext
+def import_command(kind, path, batch_size):
+  """Bulk loads venues, artists or shows from a CSV, NDJSON or JSON file."""
+  rows = _read_rows(path)
+  imported = 0
+  rejected = 0
+  start = time.perf_counter()
+
+  while True:
+    batch = list(islice(rows, batch_size))
+    if not batch:
+      break
+    inserted, errors = _import_batch(kind, batch)
+    imported += inserted
+    rejected += len(errors)
+    for line, field_errors in errors:
+      click.echo('line %d: %s' % (line, '; '.join('%s: %s' % (field, ' '.join(messages)) for field, messages in field_errors.items())), err=True)
+
+  # Once for the whole import rather than after every batch. Artists only appear in the views through their shows
+  if imported and kind != 'artists':
+    refresh_after_write('venue_areas', 'upcoming_shows')
+
+  elapsed = time.perf_counter() - start
+  click.echo('%d %s imported, %d rejected in %.1fs (%.0f rows/s)' % (imported, kind, rejected, elapsed, (imported + rejected) / elapsed if elapsed else 0))
+  if rejected:
+    sys.exit(1)
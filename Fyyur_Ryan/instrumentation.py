@@ -0,0 +1,131 @@
+import json
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#
+# Engine event hooks count the statements each request runs, the time spent
+# in the database and the rows fetched. The totals go out as a Server-Timing
+# header, readable in the browser's network panel:
+#
+#   Server-Timing: db;dur=4.21;desc="3 statements, 57 rows", app;dur=12.80
+#
+# and as one JSON log line per request. Statements slower than
+# SQL_SLOW_QUERY_MS are logged with their parameters and the view that ran
+# them, and a statement repeated more than SQL_REPEATED_STATEMENT_LIMIT times
+# in one request is flagged as a likely N+1. Streamed responses only report
+# the queries run before the body starts streaming.
+#----------------------------------------------------------------------------#
+
+MAX_LOGGED_PARAMETERS = 500
+
+
+class RequestStats(object):
+  '''The statements one request ran, kept on flask.g while it is handled.'''
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.statements = 0
+    self.db_time = 0.0
+    self.rows = 0
+    self.repeated = Counter()
+
+
+class QueryStats(object):
+  '''
+  Flask extension instrumenting the SQL run by each request. Configured with SQL_INSTRUMENTATION,
+  SQL_SLOW_QUERY_MS and SQL_REPEATED_STATEMENT_LIMIT.
+  '''
+
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('SQL_INSTRUMENTATION', True)
+    app.config.setdefault('SQL_SLOW_QUERY_MS', 200)
+    app.config.setdefault('SQL_REPEATED_STATEMENT_LIMIT', 10)
+    app.extensions['query_stats'] = self
+    if not app.config['SQL_INSTRUMENTATION']:
+      return
+
+    # Listening on the Engine class covers whichever engine the app ends up connecting with
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+      event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+      event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _start_request():
+  # Static files never touch the database and would only add noise to the log
+  if request.endpoint not in ('static', 'assets'):
+    g.sql_stats = RequestStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  # Kept on the statement's execution context rather than the connection, a statement that raises never
+  # reaches _after_cursor_execute and its context goes away with it
+  context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  elapsed = time.perf_counter() - context._query_started
+  if not has_request_context() or 'sql_stats' not in g:
+    return
+
+  stats = g.sql_stats
+  stats.statements += 1
+  stats.db_time += elapsed
+  stats.repeated[statement] += 1
+  if cursor.description is not None and cursor.rowcount > 0:
+    stats.rows += cursor.rowcount
+
+  if elapsed * 1000 >= current_app.config['SQL_SLOW_QUERY_MS']:
+    current_app.logger.warning(json.dumps({
+      'event': 'slow_query',
+      'view': request.endpoint,
+      'path': request.path,
+      'duration_ms': round(elapsed * 1000, 2),
+      'statement': statement,
+      'parameters': repr(parameters)[:MAX_LOGGED_PARAMETERS]
+    }))
+
+
+def _finish_request(response):
+  stats = g.pop('sql_stats', None)
+  if stats is None:
+    return response
+  duration = time.perf_counter() - stats.started
+
+  response.headers.add('Server-Timing', 'db;dur=%.2f;desc="%d statements, %d rows", app;dur=%.2f' % (
+    stats.db_time * 1000, stats.statements, stats.rows, duration * 1000))
+
+  limit = current_app.config['SQL_REPEATED_STATEMENT_LIMIT']
+  repeated = [(statement, count) for statement, count in stats.repeated.items() if count > limit]
+  for statement, count in repeated:
+    current_app.logger.warning(json.dumps({
+      'event': 'n_plus_one',
+      'view': request.endpoint,
+      'path': request.path,
+      'count': count,
+      'statement': statement
+    }))
+
+  current_app.logger.info(json.dumps({
+    'event': 'request',
+    'view': request.endpoint,
+    'method': request.method,
+    'path': request.path,
+    'status': response.status_code,
+    'duration_ms': round(duration * 1000, 2),
+    'db_ms': round(stats.db_time * 1000, 2),
+    'statements': stats.statements,
+    'rows': stats.rows,
+    'n_plus_one': bool(repeated)
+  }))
+  return response
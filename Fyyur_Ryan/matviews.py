@@ -0,0 +1,58 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from extensions import cache
+
+#----------------------------------------------------------------------------#
+# Materialized views.
+#
+#   flask refresh-views
+#
+# venue_areas and upcoming_shows (see the migrations and models.py) hold the
+# /venues and /shows listings precomputed. With USE_MATERIALIZED_VIEWS set
+# those pages read the views instead of joining the base tables, and the
+# writes that change a listing refresh its view once they have committed.
+# Refreshes run CONCURRENTLY, so pages keep reading the old contents until
+# the new ones are ready.
+#
+# What is upcoming is decided when a view is refreshed. The show listing still
+# drops shows that have started since, but the venue counts only catch up at
+# the next refresh, so run flask refresh-views from cron next to roll-shows.
+#----------------------------------------------------------------------------#
+
+# The response cache keys rendered from each view, invalidated after it is refreshed
+MATERIALIZED_VIEWS = {
+  'venue_areas': ['venues'],
+  'upcoming_shows': ['shows'],
+}
+
+
+def refresh(*names):
+  '''Refreshes the named views, all of them when none are named, one transaction each.'''
+  names = names or list(MATERIALIZED_VIEWS)
+  for name in names:
+    db.session.execute(db.text('REFRESH MATERIALIZED VIEW CONCURRENTLY %s' % name))
+    db.session.commit()
+  cache.invalidate(*[key for name in names for key in MATERIALIZED_VIEWS[name]])
+
+
+def refresh_after_write(*names):
+  # Called after a write has committed. A failed refresh is logged rather than raised, the write itself
+  # went through and the next scheduled refresh brings the view up to date
+  if not current_app.config['USE_MATERIALIZED_VIEWS']:
+    return
+  try:
+    refresh(*names)
+  except Exception:
+    db.session.rollback()
+    current_app.logger.exception('Refreshing %s failed', ', '.join(names))
+
+
+@click.command('refresh-views')
+@click.argument('names', nargs=-1, type=click.Choice(sorted(MATERIALIZED_VIEWS)))
+@with_appcontext
+def refresh_views_command(names):
+  """Refreshes the materialized views, all of them by default. Meant to run from cron."""
+  refresh(*names)
+  print('refreshed %s' % ', '.join(names or MATERIALIZED_VIEWS))
@@ -0,0 +1,26 @@
+"""add gin indexes on venue and artist genres
+
+Revision ID: 0a6c3e5f8b24
+Revises: f2b8d4e6a913
+Create Date: 2026-10-18 18:07:45.631092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c3e5f8b24'
+down_revision = 'f2b8d4e6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
@@ -0,0 +1,64 @@
+"""add show duration and exclusion constraints against double bookings
+
+Revision ID: 7c1e9a4d2f60
+Revises: 0a6c3e5f8b24
+Create Date: 2026-10-18 19:12:03.418277
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e9a4d2f60'
+down_revision = '0a6c3e5f8b24'
+branch_labels = None
+depends_on = None
+
+# Conflicts shown when the upgrade stops on them
+REPORT_LIMIT = 50
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('duration', sa.Interval(), server_default=sa.text("'2 hours'"), nullable=False))
+
+    # Shows listed before durations existed may already overlap, with the default duration each one runs into
+    # the next show at its venue or by its artist that starts within two hours. Those are double bookings only
+    # someone can settle, so the upgrade stops and lists them rather than shortening or dropping any show
+    connection = op.get_bind()
+    conflicts = connection.execute(sa.text('''
+        SELECT kind, owner_id, id, next_id, start_time, next_start_time FROM (
+            SELECT 'venue' AS kind, venue_id AS owner_id, id, start_time, duration,
+                lead(id) OVER (PARTITION BY venue_id ORDER BY start_time, id) AS next_id,
+                lead(start_time) OVER (PARTITION BY venue_id ORDER BY start_time, id) AS next_start_time
+            FROM "Show"
+            UNION ALL
+            SELECT 'artist', artist_id, id, start_time, duration,
+                lead(id) OVER (PARTITION BY artist_id ORDER BY start_time, id),
+                lead(start_time) OVER (PARTITION BY artist_id ORDER BY start_time, id)
+            FROM "Show"
+        ) AS next
+        WHERE next_start_time < start_time + duration
+        ORDER BY start_time, kind, owner_id
+    ''')).all()
+    if conflicts:
+        raise RuntimeError('%d pairs of shows overlap at the same venue or by the same artist. Move or delete them, then upgrade again:\n%s' % (
+            len(conflicts),
+            '\n'.join('  %s %d: show %d at %s and show %d at %s' % (kind, owner_id, show_id, start_time, next_id, next_start_time)
+                      for kind, owner_id, show_id, next_id, start_time, next_start_time in conflicts[:REPORT_LIMIT])
+        ))
+
+    # An empty booking range overlaps nothing, so a zero length show would slip past the exclusion constraints
+    op.create_check_constraint('ck_Show_duration', 'Show', "duration > interval '0' AND duration <= interval '1 day'")
+
+    # btree_gist provides the GiST equality operator for the integer ids
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_venue_id_booking" EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, start_time + duration) WITH &&)')
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_artist_id_booking" EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, start_time + duration) WITH &&)')
+
+
+def downgrade():
+    op.drop_constraint('ex_Show_artist_id_booking', 'Show')
+    op.drop_constraint('ex_Show_venue_id_booking', 'Show')
+    op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    op.drop_column('Show', 'duration')
@@ -0,0 +1,28 @@
+"""add composite indexes on show
+
+Revision ID: 8e4d2b6f1a37
+Revises: 5c1f0e7a9b21
+Create Date: 2026-10-18 10:03:17.552940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4d2b6f1a37'
+down_revision = '5c1f0e7a9b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_start_time', 'Show', ['start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time', table_name='Show')
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
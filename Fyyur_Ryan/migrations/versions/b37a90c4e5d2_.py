@@ -0,0 +1,48 @@
+"""add denormalized show counters to venue and artist
+
+Revision ID: b37a90c4e5d2
+Revises: 8e4d2b6f1a37
+Create Date: 2026-10-18 11:26:48.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b37a90c4e5d2'
+down_revision = '8e4d2b6f1a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('counted_as_upcoming', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('Venue', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Venue', sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Artist', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Artist', sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the counters from the shows already in the table
+    op.execute('UPDATE "Show" SET counted_as_upcoming = start_time > now()')
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.execute('''
+            UPDATE "{table}" SET
+                upcoming_shows_count = counts.upcoming,
+                past_shows_count = counts.past
+            FROM (
+                SELECT {key} AS id,
+                    count(*) FILTER (WHERE counted_as_upcoming) AS upcoming,
+                    count(*) FILTER (WHERE NOT counted_as_upcoming) AS past
+                FROM "Show" GROUP BY {key}
+            ) AS counts
+            WHERE "{table}".id = counts.id
+        '''.format(table=table, key=key))
+
+
+def downgrade():
+    op.drop_column('Artist', 'past_shows_count')
+    op.drop_column('Artist', 'upcoming_shows_count')
+    op.drop_column('Venue', 'past_shows_count')
+    op.drop_column('Venue', 'upcoming_shows_count')
+    op.drop_column('Show', 'counted_as_upcoming')
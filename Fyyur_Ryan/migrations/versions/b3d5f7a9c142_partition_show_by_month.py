@@ -0,0 +1,205 @@
+"""partition the show table by month of start_time
+
+Revision ID: b3d5f7a9c142
+Revises: 7c1e9a4d2f60
+Create Date: 2026-10-18 20:41:26.905114
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d5f7a9c142'
+down_revision = '7c1e9a4d2f60'
+branch_labels = None
+depends_on = None
+
+# Partitions are created up to this many months ahead, `flask show-partitions` keeps adding them from then on
+MONTHS_AHEAD = 12
+
+INDEXES = [
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', ['start_time', 'id']),
+    ('ix_Show_updated_at', ['updated_at']),
+]
+
+BOOKING_CONSTRAINTS = [
+    'ALTER TABLE "{table}" ADD CONSTRAINT "ex_{table}_venue_id_booking" EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, start_time + duration) WITH &&)',
+    'ALTER TABLE "{table}" ADD CONSTRAINT "ex_{table}_artist_id_booking" EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, start_time + duration) WITH &&)',
+]
+
+# The same views as in e4a7c9d1b356, they have to be dropped with the table they read
+MATERIALIZED_VIEWS = [
+    '''
+    CREATE MATERIALIZED VIEW venue_areas AS
+    SELECT "Venue".id, "Venue".name, "Venue".city, "Venue".state,
+           count("Show".id) FILTER (WHERE "Show".start_time > localtimestamp) AS num_upcoming_shows,
+           "Venue".updated_at
+    FROM "Venue" LEFT JOIN "Show" ON "Show".venue_id = "Venue".id
+    GROUP BY "Venue".id
+    ''',
+    '''
+    CREATE MATERIALIZED VIEW upcoming_shows AS
+    SELECT "Show".id, "Show".start_time,
+           "Show".venue_id, "Venue".name AS venue_name, "Venue".image_link AS venue_image_link, "Venue".city, "Venue".state,
+           "Show".artist_id, "Artist".name AS artist_name, "Artist".image_link AS artist_image_link,
+           greatest("Show".updated_at, "Venue".updated_at, "Artist".updated_at) AS updated_at
+    FROM "Show"
+    JOIN "Venue" ON "Venue".id = "Show".venue_id
+    JOIN "Artist" ON "Artist".id = "Show".artist_id
+    WHERE "Show".start_time > localtimestamp
+    ''',
+]
+
+# Shows in different partitions are not covered by the partitions' exclusion constraints. Durations are at most a
+# day, so that only matters for a show running past the end of its month or starting in the first day of one.
+# Those take a lock per venue and artist, so two of them are checked one after the other, and look for overlapping
+# shows across the whole table
+BOOKING_TRIGGER = '''
+    CREATE FUNCTION show_booking_across_partitions() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        month timestamp := date_trunc('month', NEW.start_time);
+    BEGIN
+        IF NEW.start_time >= month + interval '1 day' AND NEW.start_time + NEW.duration <= month + interval '1 month' THEN
+            RETURN NEW;
+        END IF;
+        PERFORM pg_advisory_xact_lock(hashtext('Show.venue_id'), NEW.venue_id);
+        PERFORM pg_advisory_xact_lock(hashtext('Show.artist_id'), NEW.artist_id);
+        IF EXISTS (
+            SELECT 1 FROM "Show"
+            WHERE id <> NEW.id AND (venue_id = NEW.venue_id OR artist_id = NEW.artist_id)
+              AND tsrange(start_time, start_time + duration) && tsrange(NEW.start_time, NEW.start_time + NEW.duration)
+        ) THEN
+            RAISE EXCEPTION 'show % overlaps another booking of venue % or artist %', NEW.id, NEW.venue_id, NEW.artist_id
+                USING ERRCODE = 'exclusion_violation';
+        END IF;
+        RETURN NEW;
+    END
+    $$
+'''
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_indexes():
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns, unique=False)
+
+
+def create_materialized_views():
+    for view in MATERIALIZED_VIEWS:
+        op.execute(view)
+    op.create_index('ix_venue_areas_id', 'venue_areas', ['id'], unique=True)
+    op.create_index('ix_venue_areas_state_city_id', 'venue_areas', ['state', 'city', 'id'], unique=False)
+    op.create_index('ix_upcoming_shows_id', 'upcoming_shows', ['id'], unique=True)
+    op.create_index('ix_upcoming_shows_start_time_id', 'upcoming_shows', ['start_time', 'id'], unique=False)
+
+
+def upgrade():
+    op.execute('DROP MATERIALIZED VIEW upcoming_shows')
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
+
+    # The old table is kept under another name until its rows are copied, its indexes and constraints are
+    # dropped or renamed first as the new table's take the same names
+    op.rename_table('Show', 'Show_unpartitioned')
+    op.execute('ALTER TABLE "Show_unpartitioned" RENAME CONSTRAINT "Show_pkey" TO "Show_unpartitioned_pkey"')
+    op.drop_constraint('ex_Show_venue_id_booking', 'Show_unpartitioned')
+    op.drop_constraint('ex_Show_artist_id_booking', 'Show_unpartitioned')
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='Show_unpartitioned')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+
+    # The primary key of a partitioned table has to include the partition key. The foreign keys are named, the
+    # old table still holds the default names
+    op.execute('''
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'::regclass),
+            start_time timestamp without time zone NOT NULL,
+            venue_id integer NOT NULL CONSTRAINT "Show_venue_id_fkey" REFERENCES "Venue" (id),
+            artist_id integer NOT NULL CONSTRAINT "Show_artist_id_fkey" REFERENCES "Artist" (id),
+            duration interval NOT NULL DEFAULT '2 hours',
+            counted_as_upcoming boolean NOT NULL DEFAULT false,
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT "Show_pkey" PRIMARY KEY (id, start_time),
+            CONSTRAINT "ck_Show_duration" CHECK (duration > interval '0' AND duration <= interval '1 day')
+        ) PARTITION BY RANGE (start_time)
+    ''')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    create_indexes()
+
+    connection = op.get_bind()
+    first = connection.execute(sa.text('SELECT min(start_time) FROM "Show_unpartitioned"')).scalar() or datetime.now()
+    month = date(first.year, first.month, 1)
+    last = add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    tables = ['Show_default']
+    op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+    while month <= last:
+        table = 'Show_%04d_%02d' % (month.year, month.month)
+        op.execute('''CREATE TABLE "%s" PARTITION OF "Show" FOR VALUES FROM ('%s') TO ('%s')''' % (table, month, add_months(month, 1)))
+        tables.append(table)
+        month = add_months(month, 1)
+    for table in tables:
+        for constraint in BOOKING_CONSTRAINTS:
+            op.execute(constraint.format(table=table))
+
+    op.execute('''
+        INSERT INTO "Show" (id, start_time, venue_id, artist_id, duration, counted_as_upcoming, updated_at)
+        SELECT id, start_time, venue_id, artist_id, duration, counted_as_upcoming, updated_at FROM "Show_unpartitioned"
+    ''')
+    op.drop_table('Show_unpartitioned')
+
+    # Added after the copy, the rows came from a table that already kept them apart
+    op.execute(BOOKING_TRIGGER)
+    op.execute('''
+        CREATE TRIGGER show_booking_across_partitions BEFORE INSERT OR UPDATE OF start_time, duration, venue_id, artist_id ON "Show"
+        FOR EACH ROW EXECUTE FUNCTION show_booking_across_partitions()
+    ''')
+
+    create_materialized_views()
+    op.execute('ANALYZE "Show"')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW upcoming_shows')
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
+
+    op.rename_table('Show', 'Show_partitioned')
+    op.execute('DROP TRIGGER show_booking_across_partitions ON "Show_partitioned"')
+    op.execute('DROP FUNCTION show_booking_across_partitions()')
+    op.execute('ALTER TABLE "Show_partitioned" RENAME CONSTRAINT "Show_pkey" TO "Show_partitioned_pkey"')
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='Show_partitioned')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+
+    # Named foreign keys as in the upgrade
+    op.execute('''
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'::regclass),
+            start_time timestamp without time zone NOT NULL,
+            venue_id integer NOT NULL CONSTRAINT "Show_venue_id_fkey" REFERENCES "Venue" (id),
+            artist_id integer NOT NULL CONSTRAINT "Show_artist_id_fkey" REFERENCES "Artist" (id),
+            counted_as_upcoming boolean NOT NULL DEFAULT false,
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            duration interval NOT NULL DEFAULT '2 hours',
+            CONSTRAINT "Show_pkey" PRIMARY KEY (id),
+            CONSTRAINT "ck_Show_duration" CHECK (duration > interval '0' AND duration <= interval '1 day')
+        )
+    ''')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.execute('''
+        INSERT INTO "Show" (id, start_time, venue_id, artist_id, counted_as_upcoming, updated_at, duration)
+        SELECT id, start_time, venue_id, artist_id, counted_as_upcoming, updated_at, duration FROM "Show_partitioned"
+    ''')
+    op.execute('DROP TABLE "Show_partitioned" CASCADE')
+    create_indexes()
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_venue_id_booking" EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, start_time + duration) WITH &&)')
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_artist_id_booking" EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, start_time + duration) WITH &&)')
+
+    create_materialized_views()
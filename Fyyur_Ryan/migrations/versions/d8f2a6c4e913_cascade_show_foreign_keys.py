@@ -0,0 +1,40 @@
+"""delete a venue's or artist's shows with it through on delete cascade
+
+Revision ID: d8f2a6c4e913
+Revises: b3d5f7a9c142
+Create Date: 2026-10-18 22:06:48.512930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f2a6c4e913'
+down_revision = 'b3d5f7a9c142'
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ('Show_venue_id_fkey', 'Venue', 'venue_id'),
+    ('Show_artist_id_fkey', 'Artist', 'artist_id'),
+]
+
+
+def drop_foreign_keys():
+    # Dropping them from the partitioned table drops them from every partition
+    for name, table, column in FOREIGN_KEYS:
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+
+
+def upgrade():
+    # Checked against every partition in one pass each, the archived partitions have no foreign keys
+    drop_foreign_keys()
+    for name, table, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, 'Show', table, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    drop_foreign_keys()
+    for name, table, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, 'Show', table, [column], ['id'])
@@ -0,0 +1,29 @@
+"""add updated_at to shows, venues and artists
+
+Revision ID: d91f3c5a7e08
+Revises: b37a90c4e5d2
+Create Date: 2026-10-18 14:02:11.527301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91f3c5a7e08'
+down_revision = 'b37a90c4e5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start out as modified now
+    for table in ('Show', 'Venue', 'Artist'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+        op.create_index('ix_%s_updated_at' % table, table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('Artist', 'Venue', 'Show'):
+        op.drop_index('ix_%s_updated_at' % table, table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,51 @@
+"""add venue_areas and upcoming_shows materialized views
+
+Revision ID: e4a7c9d1b356
+Revises: d91f3c5a7e08
+Create Date: 2026-10-18 15:41:37.208815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c9d1b356'
+down_revision = 'd91f3c5a7e08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Show.start_time is a local timestamp without time zone, so upcoming is decided against localtimestamp.
+    # It is evaluated when the view is refreshed, readers still filter on start_time themselves
+    op.execute('''
+        CREATE MATERIALIZED VIEW venue_areas AS
+        SELECT "Venue".id, "Venue".name, "Venue".city, "Venue".state,
+               count("Show".id) FILTER (WHERE "Show".start_time > localtimestamp) AS num_upcoming_shows,
+               "Venue".updated_at
+        FROM "Venue" LEFT JOIN "Show" ON "Show".venue_id = "Venue".id
+        GROUP BY "Venue".id
+    ''')
+    op.execute('''
+        CREATE MATERIALIZED VIEW upcoming_shows AS
+        SELECT "Show".id, "Show".start_time,
+               "Show".venue_id, "Venue".name AS venue_name, "Venue".image_link AS venue_image_link, "Venue".city, "Venue".state,
+               "Show".artist_id, "Artist".name AS artist_name, "Artist".image_link AS artist_image_link,
+               greatest("Show".updated_at, "Venue".updated_at, "Artist".updated_at) AS updated_at
+        FROM "Show"
+        JOIN "Venue" ON "Venue".id = "Show".venue_id
+        JOIN "Artist" ON "Artist".id = "Show".artist_id
+        WHERE "Show".start_time > localtimestamp
+    ''')
+
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on each view
+    op.create_index('ix_venue_areas_id', 'venue_areas', ['id'], unique=True)
+    op.create_index('ix_venue_areas_state_city_id', 'venue_areas', ['state', 'city', 'id'], unique=False)
+    op.create_index('ix_upcoming_shows_id', 'upcoming_shows', ['id'], unique=True)
+    op.create_index('ix_upcoming_shows_start_time_id', 'upcoming_shows', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW upcoming_shows')
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
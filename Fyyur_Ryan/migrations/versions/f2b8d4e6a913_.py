@@ -0,0 +1,27 @@
+"""index shows by start time and id for date range pages
+
+Revision ID: f2b8d4e6a913
+Revises: e4a7c9d1b356
+Create Date: 2026-10-18 16:52:09.114620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4e6a913'
+down_revision = 'e4a7c9d1b356'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replaces the start_time index, which the new one covers as its leading column
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+    op.drop_index('ix_Show_start_time', table_name='Show')
+
+
+def downgrade():
+    op.create_index('ix_Show_start_time', 'Show', ['start_time'], unique=False)
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
@@ -1,12 +1,41 @@
-from app import db
+from datetime import timedelta
+from routing import RoutingSQLAlchemy
 
+db = RoutingSQLAlchemy()
+
+
+# How long a show books its venue and artist for when no duration is given
+SHOW_DURATION = timedelta(hours=2)
+# The longest booking ck_Show_duration allows
+MAX_SHOW_DURATION = timedelta(days=1)
 
 class Show(db.Model):
   __tablename__ = 'Show'
+  # The table's primary key is (id, start_time) as it is partitioned by start_time, id alone is still unique
   id = db.Column(db.Integer, primary_key=True)
   start_time = db.Column(db.DateTime, nullable=False)
-  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+  # Deleting a venue or an artist deletes their shows in the database (see deletes.py)
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+  duration = db.Column(db.Interval, nullable=False, default=SHOW_DURATION, server_default=db.text("'2 hours'"))
+  counted_as_upcoming = db.Column(db.Boolean, nullable=False, default=False, server_default='false') # Which of the venue and artist counters the show currently sits in
+  updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+  # Every page filters shows by venue or artist and start time, or by start time alone. Shows are not inserted
+  # in start time order, so a BRIN index would not narrow anything down. The id in the start time index is the
+  # listings' tie-breaker, so a date range page is read in keyset order straight off the index.
+  # The table is partitioned by month of start_time (see partitions.py), so queries on upcoming shows only
+  # read the recent partitions. Each partition has exclusion constraints rejecting a show that overlaps
+  # another one at the same venue or by the same artist, their GiST indexes also answer the availability
+  # checks (see queries.booking_conflicts())
+  __table_args__ = (
+    db.CheckConstraint("duration > interval '0' AND duration <= interval '1 day'", name='ck_Show_duration'),
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    db.Index('ix_Show_updated_at', 'updated_at'),
+    {'postgresql_partition_by': 'RANGE (start_time)'},
+  )
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
@@ -22,7 +51,20 @@ class Venue(db.Model):
     website_link = db.Column(db.String())
     looking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
-    shows = db.relationship('Show', backref=db.backref('Venue'), lazy=True, cascade='all, delete-orphan')
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every write to the row, including the counter updates, and read by the conditional GET validators
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+    # passive_deletes leaves the shows to the foreign key's ON DELETE CASCADE instead of loading them first
+    shows = db.relationship('Show', backref=db.backref('Venue'), lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    # Trigram index so the name search can use ILIKE '%term%' and similarity ranking without a sequential scan,
+    # and a GIN index on the genres for the genre filters' @> and && operators
+    __table_args__ = (
+      db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+      db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+      db.Index('ix_Venue_updated_at', 'updated_at'),
+    )
 
 
 class Artist(db.Model):
@@ -39,4 +81,52 @@ class Artist(db.Model):
     website_link = db.Column(db.String())
     looking_venues = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
-    shows = db.relationship('Show', backref=db.backref('Artist'), lazy=True)
\ No newline at end of file
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every write to the row, including the counter updates, and read by the conditional GET validators
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+    # As for Venue.shows
+    shows = db.relationship('Show', backref=db.backref('Artist'), lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    # Trigram index so the name search can use ILIKE '%term%' and similarity ranking without a sequential scan,
+    # and a GIN index on the genres for the genre filters' @> and && operators
+    __table_args__ = (
+      db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+      db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+      db.Index('ix_Artist_updated_at', 'updated_at'),
+    )
+
+
+#----------------------------------------------------------------------------#
+# Materialized views.
+#
+# Created by the migrations and refreshed by matviews.py. They sit in their own
+# MetaData so create_all() and migration autogenerate leave them alone.
+#----------------------------------------------------------------------------#
+
+views = db.MetaData()
+
+# Every venue with its area and the number of upcoming shows at the last refresh
+venue_areas_view = db.Table('venue_areas', views,
+  db.Column('id', db.Integer, primary_key=True),
+  db.Column('name', db.String),
+  db.Column('city', db.String(120)),
+  db.Column('state', db.String(120)),
+  db.Column('num_upcoming_shows', db.Integer),
+  db.Column('updated_at', db.DateTime(timezone=True)),
+)
+
+# The shows that were upcoming at the last refresh, joined to their venue and artist
+upcoming_shows_view = db.Table('upcoming_shows', views,
+  db.Column('id', db.Integer, primary_key=True),
+  db.Column('start_time', db.DateTime),
+  db.Column('venue_id', db.Integer),
+  db.Column('venue_name', db.String),
+  db.Column('venue_image_link', db.String(500)),
+  db.Column('city', db.String(120)),
+  db.Column('state', db.String(120)),
+  db.Column('artist_id', db.Integer),
+  db.Column('artist_name', db.String),
+  db.Column('artist_image_link', db.String(500)),
+  db.Column('updated_at', db.DateTime(timezone=True)),
+)
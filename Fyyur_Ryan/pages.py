@@ -0,0 +1,180 @@
+from datetime import datetime
+from flask import request
+from choices import GENRES
+from queries import shows_validator
+
+#----------------------------------------------------------------------------#
+# Page data.
+#----------------------------------------------------------------------------#
+
+# The read pages shape their query rows into the mock data format the templates expect here, so the
+# blueprint views and the async views in asgi.py render the same data.
+
+def venue_areas_data(venues):
+  areas_data = []
+
+  # Rows come back ordered by area so the venues can be grouped by state and city in one pass as per venues.html
+  for venue in venues:
+    if not areas_data or (areas_data[-1]['city'], areas_data[-1]['state']) != (venue.city, venue.state):
+      areas_data.append({
+        'city': venue.city,
+        'state': venue.state,
+        'venues': []
+      })
+
+    # Mapping the data according to the mock data format
+    areas_data[-1]['venues'].append({
+      'id': venue.id,
+      'name': venue.name,
+      'num_upcoming_shows': venue.num_upcoming_shows
+    })
+  return areas_data
+
+def search_response(search_results, prev_cursor, next_cursor):
+  total = search_results[0].total if search_results else 0
+  data = []
+
+  # Going through the results to append the results according to the mock data format
+  for search_result in search_results:
+    data.append({
+      'id': search_result.id,
+      'name': search_result.name,
+      'num_upcoming_shows': search_result.num_upcoming_shows
+    })
+
+  # Mapping the results according to the mock data format
+  return {
+    "count": total, # Total number of matches across all pages
+    "data": data,
+    "prev_cursor": prev_cursor,
+    "next_cursor": next_cursor
+    }
+
+def split_shows(shows, fields):
+  upcoming_shows = []
+  past_shows = []
+
+  # Going through every show and mapping out the data according to the mock data format
+  for show in shows:
+    show_data = {field: getattr(show, field) for field in fields}
+
+    #Adding the data acquired from the for loop to either upcoming shows or past shows depending on the start time
+    if show.is_upcoming:
+      upcoming_shows.append(show_data)
+    else:
+      past_shows.append(show_data)
+  return upcoming_shows, past_shows
+
+def venue_page_data(venue, shows):
+  upcoming_shows, past_shows = split_shows(shows, ('artist_id', 'artist_name', 'artist_image_link', 'start_time'))
+
+  # Mapping the venue data according to the mock data
+  return {
+    'id': venue.id,
+    'name': venue.name,
+    'city': venue.city,
+    'state': venue.state,
+    'address': venue.address,
+    'phone': venue.phone,
+    'genres': venue.genres,
+    'image_link': venue.image_link,
+    'facebook_link': venue.facebook_link,
+    'website': venue.website_link,
+    'seeking_talent': True if venue.looking_talent in (True, 't', 'true') else False, #Ensuring the check box contains the correct bool from the database
+    'seeking_description': venue.seeking_description,
+    'past_shows': past_shows,
+    'upcoming_shows': upcoming_shows,
+    'past_shows_count': len(past_shows), # Function to get the number of past shows
+    'upcoming_shows_count': len(upcoming_shows) # Function to get the number of upcoming shows
+  }
+
+def artist_page_data(artist, shows):
+  upcoming_shows, past_shows = split_shows(shows, ('venue_id', 'venue_name', 'venue_image_link', 'start_time'))
+
+  # Mapping out the data for the artist that will be displayed
+  return {
+    'id': artist.id,
+    'name': artist.name,
+    'genres': artist.genres,
+    'city': artist.city,
+    'state': artist.state,
+    'phone': artist.phone,
+    'website': artist.website_link,
+    'facebook_link': artist.facebook_link,
+    'seeking_venue': artist.looking_venues,
+    'seeking_description': artist.seeking_description,
+    'image_link': artist.image_link,
+    'past_shows': past_shows,
+    'upcoming_shows': upcoming_shows,
+    'past_shows_count': len(past_shows),
+    'upcoming_shows_count': len(upcoming_shows)
+  }
+
+def shows_data(shows):
+  data = []
+
+  # Going through all of the shows returned from the query and mapping them out in the format needed for the shows.html
+  for show in shows:
+    data.append({
+      'venue_id': show.venue_id,
+      'venue_name': show.venue_name,
+      'artist_id': show.artist_id,
+      'artist_name': show.artist_name,
+      'artist_image_link': show.artist_image_link,
+      'start_time': show.start_time # Handed over as a datetime, the datetime filter formats it
+    })
+  return data
+
+# The /shows query string filters, as (show_listing() argument, parser). from and to take ISO 8601 dates or
+# datetimes and to is exclusive, as in the JSON API
+SHOW_FILTERS = {
+  'from': ('start', datetime.fromisoformat),
+  'to': ('end', datetime.fromisoformat),
+  'city': ('city', str),
+  'state': ('state', str),
+  'venue_id': ('venue_id', int),
+  'artist_id': ('artist_id', int),
+}
+
+def show_filters(args):
+  # Returns the filters as show_listing() arguments and the query string arguments they came from, which the
+  # pager links carry along. Values that do not parse are ignored
+  filters = {}
+  link_args = {}
+  for arg, (name, parse) in SHOW_FILTERS.items():
+    value = args.get(arg, type=parse)
+    if value:
+      filters[name] = value
+      link_args[arg] = args[arg]
+  return filters, link_args
+
+def shows_page_validator():
+  # Shows starting in the past are not in the upcoming_shows view, shows_validator() needs to know where the range starts
+  filters, link_args = show_filters(request.args)
+  return shows_validator(filters.get('start'))
+
+def genre_filter(args):
+  # The genres picked in the query string (?genre=Jazz&genre=Blues), ones that are not in the form's choices
+  # are dropped. Rows have to match all of them, or any of them with ?match=any
+  genres = [genre for genre in args.getlist('genre') if genre in GENRES]
+  return genres, 'any' if args.get('match') == 'any' else 'all'
+
+def genre_link_args(genres, match):
+  # The query string arguments for a genre filter, ?match=all is the default and left out
+  return {'genre': genres, 'match': 'any' if match == 'any' else None}
+
+def genre_facets_data(facets, genres, match, **link_args):
+  # Every genre in the form's choices with its count and the query string of its link, which adds the genre to
+  # the picked ones or takes it off again, keeping the page's other arguments (link_args)
+  counts = dict((facet.genre, facet.count) for facet in facets)
+  data = []
+  for genre in GENRES:
+    selected = genre in genres
+    picked = [other for other in genres if other != genre] if selected else genres + [genre]
+    data.append({
+      'genre': genre,
+      'count': counts.get(genre, 0),
+      'selected': selected,
+      'link_args': dict(link_args, **genre_link_args(picked, match))
+    })
+  return data
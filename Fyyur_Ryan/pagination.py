@@ -0,0 +1,122 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_, tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#
+# Pages are fetched with "WHERE (sort keys) > (last row seen)" instead of
+# OFFSET, so page N costs the same as page 1. The position is passed around
+# as an opaque cursor holding the sort key values of a row. A cursor that
+# does not decode to a value of each key's type is ignored by the pages and
+# turned down by the API (strict=True).
+#----------------------------------------------------------------------------#
+
+
+def encode_cursor(values):
+  return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+class InvalidCursor(ValueError):
+  pass
+
+
+def _key_value(column, value):
+  # The JSON value of one key converted back to the column's type, anything else is not a cursor we handed out
+  try:
+    python_type = column.type.python_type
+  except NotImplementedError:
+    python_type = None
+  if python_type in (datetime, date) and isinstance(value, str):
+    parsed = datetime.fromisoformat(value)
+    return parsed if python_type is datetime else parsed.date()
+  if python_type is float and type(value) in (int, float):
+    return float(value)
+  if python_type in (int, str) and type(value) is python_type:
+    return value
+  raise ValueError('%r is not a value of %s' % (value, column))
+
+
+def decode_cursor(cursor, keys):
+  '''The sort key values in the cursor, raises InvalidCursor unless there is one of the right type for each key.'''
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list) or len(values) != len(keys):
+      raise ValueError('expected %d values' % len(keys))
+    return [_key_value(column, value) for (name, column, descending), value in zip(keys, values)]
+  except (ValueError, TypeError, binascii.Error) as error:
+    raise InvalidCursor('invalid cursor: %s' % error)
+
+
+def _beyond(keys, values):
+  # Rows that sort after the given key values. A plain row comparison is used when every key sorts
+  # the same way (so the index can be used), otherwise it is spelled out key by key
+  if len(set(descending for name, column, descending in keys)) == 1:
+    columns = tuple_(*[column for name, column, descending in keys])
+    return columns < tuple_(*values) if keys[0][2] else columns > tuple_(*values)
+
+  clauses = []
+  for i, (name, column, descending) in enumerate(keys):
+    earlier_keys_equal = [key[1] == value for key, value in zip(keys[:i], values[:i])]
+    clauses.append(and_(*earlier_keys_equal, column < values[i] if descending else column > values[i]))
+  return or_(*clauses)
+
+
+def keyset_query(query, keys, page_size, after=None, before=None, strict=False):
+  '''
+  Filters, orders and limits the query for one page. Returns the query and the paging state to hand to
+  keyset_result() with the rows it returns, for callers that execute the query themselves. An invalid cursor
+  raises InvalidCursor when strict, otherwise the first page is returned.
+  '''
+  # An empty ?before= or ?after= is no cursor, as is an invalid one when not strict, either way the first page
+  after = after or None
+  before = before or None
+  backwards = before is not None and after is None
+  cursor = None
+  if after or before:
+    try:
+      cursor = decode_cursor(before if backwards else after, keys)
+    except InvalidCursor:
+      if strict:
+        raise
+      backwards = False
+
+  # Walking backwards is walking forwards over the reversed ordering
+  walk = [(name, column, descending != backwards) for name, column, descending in keys]
+  if cursor is not None:
+    query = query.filter(_beyond(walk, cursor))
+  query = query.order_by(*[column.desc() if descending else column.asc() for name, column, descending in walk])
+
+  # One extra row tells whether there is another page in the walking direction
+  return query.limit(page_size + 1), (backwards, cursor is not None)
+
+
+def keyset_result(rows, keys, page_size, state):
+  '''Trims the rows fetched by a keyset_query() to the page and builds the previous and next cursors.'''
+  backwards, had_cursor = state
+  rows = list(rows)
+  more = len(rows) > page_size
+  rows = rows[:page_size]
+  if backwards:
+    rows.reverse()
+
+  def row_cursor(row):
+    return encode_cursor([getattr(row, name) for name, column, descending in keys])
+
+  has_prev = more if backwards else had_cursor
+  has_next = had_cursor if backwards else more
+  prev_cursor = row_cursor(rows[0]) if rows and has_prev else None
+  next_cursor = row_cursor(rows[-1]) if rows and has_next else None
+  return rows, prev_cursor, next_cursor
+
+
+def keyset_page(query, keys, page_size, after=None, before=None, strict=False):
+  '''
+  Fetches one page of the query ordered by keys, a list of (label, column, descending) tuples.
+  Every label must also be a column returned by the query so the cursors can be built from the rows.
+  Returns the rows with the cursors of the previous and next pages (None when there is no such page).
+  '''
+  query, state = keyset_query(query, keys, page_size, after, before, strict)
+  return keyset_result(query.all(), keys, page_size, state)
@@ -0,0 +1,133 @@
+import re
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, Show
+from extensions import cache
+from shows import uncount_shows
+
+#----------------------------------------------------------------------------#
+# Show partitions.
+#
+#   flask show-partitions                        partitions up to 12 months ahead
+#   flask show-partitions --archive-before 24    and archive those over 24 months old
+#
+# "Show" is partitioned by start_time, one partition a month named
+# Show_<year>_<month>, with Show_default taking shows outside of them. Shows
+# only overlap ones in the same partition, so the booking constraints are
+# kept on each partition (see the migration for the ones crossing a month
+# boundary). Run the command from cron so partitions exist before shows are
+# booked in them.
+#
+# Archiving detaches a partition and moves it into the archive schema. Its
+# shows come off the venues' and artists' counters and pages, the rows are
+# kept for reporting.
+#----------------------------------------------------------------------------#
+
+ARCHIVE_SCHEMA = 'archive'
+PARTITION_NAME = re.compile(r'^Show_(\d{4})_(\d{2})$')
+
+# Added to every partition, the ranges are only compared within one
+BOOKING_CONSTRAINTS = [
+  'ALTER TABLE "{table}" ADD CONSTRAINT "ex_{table}_venue_id_booking" EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, start_time + duration) WITH &&)',
+  'ALTER TABLE "{table}" ADD CONSTRAINT "ex_{table}_artist_id_booking" EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, start_time + duration) WITH &&)',
+]
+
+
+def month_start(value):
+  return date(value.year, value.month, 1)
+
+
+def add_months(month, months):
+  index = month.year * 12 + month.month - 1 + months
+  return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+  return 'Show_%04d_%02d' % (month.year, month.month)
+
+
+def partitions():
+  '''The first day of the month of each monthly partition attached to "Show", in order.'''
+  names = db.session.execute(db.text('''
+    SELECT child.relname FROM pg_inherits JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = '"Show"'::regclass
+  ''')).scalars()
+  return sorted(date(int(match.group(1)), int(match.group(2)), 1) for match in map(PARTITION_NAME.match, names) if match)
+
+
+def create_partition(month):
+  '''
+  Adds the month's partition, in one transaction. Shows booked in that month before it existed are moved over
+  from Show_default, which cannot hold rows of a range being attached.
+  '''
+  table = partition_name(month)
+  bounds = {'lower': datetime.combine(month, datetime.min.time()), 'upper': datetime.combine(add_months(month, 1), datetime.min.time())}
+  db.session.execute(db.text('CREATE TABLE "%s" (LIKE "Show" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % table))
+  db.session.execute(db.text('''
+    WITH moved AS (DELETE FROM "Show_default" WHERE start_time >= :lower AND start_time < :upper RETURNING *)
+    INSERT INTO "%s" SELECT * FROM moved
+  ''' % table), bounds)
+  # Attaching adds the parent's indexes, foreign keys and triggers to the partition
+  db.session.execute(db.text('ALTER TABLE "Show" ATTACH PARTITION "%s" FOR VALUES FROM (:lower) TO (:upper)' % table), bounds)
+  for constraint in BOOKING_CONSTRAINTS:
+    db.session.execute(db.text(constraint.format(table=table)))
+  db.session.commit()
+
+
+def create_partitions(first, last):
+  '''Creates the missing monthly partitions from the month of first to the month of last. Returns their months.'''
+  existing = set(partitions())
+  month = month_start(first)
+  created = []
+  while month <= month_start(last):
+    if month not in existing:
+      create_partition(month)
+      created.append(month)
+    month = add_months(month, 1)
+  return created
+
+
+def archive_partition(month):
+  '''Takes the month's shows off the counters, then detaches its partition into the archive schema.'''
+  table = partition_name(month)
+  in_month = (Show.start_time >= month, Show.start_time < add_months(month, 1))
+  pages = ['venue:%d' % row.venue_id for row in Show.query.with_entities(Show.venue_id).filter(*in_month).distinct()]
+  pages += ['artist:%d' % row.artist_id for row in Show.query.with_entities(Show.artist_id).filter(*in_month).distinct()]
+
+  uncount_shows(*in_month)
+  db.session.execute(db.text('ALTER TABLE "Show" DETACH PARTITION "%s"' % table))
+  # The archived shows stay when their venue or artist is deleted later on
+  foreign_keys = db.session.execute(db.text('''
+    SELECT conname FROM pg_constraint WHERE conrelid = '"%s"'::regclass AND contype = 'f'
+  ''' % table)).scalars().all()
+  for name in foreign_keys:
+    db.session.execute(db.text('ALTER TABLE "%s" DROP CONSTRAINT "%s"' % (table, name)))
+  db.session.execute(db.text('CREATE SCHEMA IF NOT EXISTS %s' % ARCHIVE_SCHEMA))
+  db.session.execute(db.text('ALTER TABLE "%s" SET SCHEMA %s' % (table, ARCHIVE_SCHEMA)))
+  db.session.commit()
+  cache.invalidate('venues', 'artists', *pages)
+
+
+def archive_partitions(before):
+  '''Archives every monthly partition ending on or before the month of before. Returns their months.'''
+  archived = [month for month in partitions() if add_months(month, 1) <= month_start(before)]
+  for month in archived:
+    archive_partition(month)
+  return archived
+
+
+@click.command('show-partitions')
+@click.option('--months-ahead', default=12, show_default=True, help='Months from the current one to have partitions for.')
+@click.option('--archive-before', type=int, help='Archive the partitions of shows more than this many months old.')
+@with_appcontext
+def show_partitions_command(months_ahead, archive_before):
+  """Creates the monthly Show partitions ahead of time and archives old ones. Meant to run from cron."""
+  this_month = month_start(date.today())
+  for month in create_partitions(this_month, add_months(this_month, months_ahead)):
+    print('created %s' % partition_name(month))
+  if archive_before is not None:
+    for month in archive_partitions(add_months(this_month, -archive_before)):
+      print('archived %s to %s.%s' % (partition_name(month), ARCHIVE_SCHEMA, partition_name(month)))
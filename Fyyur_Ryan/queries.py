@@ -0,0 +1,350 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import cast, func, or_
+from sqlalchemy.dialects.postgresql import array
+from models import db, Show, Venue, Artist, MAX_SHOW_DURATION, venue_areas_view, upcoming_shows_view
+
+#----------------------------------------------------------------------------#
+# Queries.
+#
+# The listing queries shared by the HTML pages and the JSON API. Each builds
+# an unexecuted query selecting only the requested fields, so the callers can
+# page it with keyset_page() or stream it. With USE_MATERIALIZED_VIEWS set,
+# the venue and show listings read the materialized views instead.
+#----------------------------------------------------------------------------#
+
+VENUE_FIELDS = {
+  'id': Venue.id,
+  'name': Venue.name,
+  'city': Venue.city,
+  'state': Venue.state,
+  'address': Venue.address,
+  'phone': Venue.phone,
+  'genres': Venue.genres,
+  'image_link': Venue.image_link,
+  'facebook_link': Venue.facebook_link,
+  'website': Venue.website_link,
+  'seeking_talent': Venue.looking_talent,
+  'seeking_description': Venue.seeking_description,
+  'upcoming_shows_count': Venue.upcoming_shows_count,
+  'past_shows_count': Venue.past_shows_count,
+}
+
+ARTIST_FIELDS = {
+  'id': Artist.id,
+  'name': Artist.name,
+  'city': Artist.city,
+  'state': Artist.state,
+  'phone': Artist.phone,
+  'genres': Artist.genres,
+  'image_link': Artist.image_link,
+  'facebook_link': Artist.facebook_link,
+  'website': Artist.website_link,
+  'seeking_venue': Artist.looking_venues,
+  'seeking_description': Artist.seeking_description,
+  'upcoming_shows_count': Artist.upcoming_shows_count,
+  'past_shows_count': Artist.past_shows_count,
+}
+
+SHOW_FIELDS = {
+  'id': Show.id,
+  'start_time': Show.start_time,
+  'venue_id': Show.venue_id,
+  'venue_name': Venue.name,
+  'venue_image_link': Venue.image_link,
+  'city': Venue.city,
+  'state': Venue.state,
+  'artist_id': Show.artist_id,
+  'artist_name': Artist.name,
+  'artist_image_link': Artist.image_link,
+}
+
+# Sort keys used to page each listing, as (label, column, descending) tuples for keyset_page()
+VENUE_KEYS = [('id', Venue.id, False)]
+ARTIST_KEYS = [('id', Artist.id, False)]
+SHOW_KEYS = [('start_time', Show.start_time, False), ('id', Show.id, False)]
+
+# The same show fields and keys, read from the upcoming_shows view
+UPCOMING_SHOW_FIELDS = {name: upcoming_shows_view.c[name] for name in SHOW_FIELDS}
+UPCOMING_SHOW_KEYS = [('start_time', upcoming_shows_view.c.start_time, False), ('id', upcoming_shows_view.c.id, False)]
+
+
+def use_materialized_views():
+  return current_app.config['USE_MATERIALIZED_VIEWS']
+
+
+def _select(columns, fields, keys):
+  # The sort keys are always selected so the cursors can be built from the rows
+  names = list(dict.fromkeys(list(fields) + [name for name, column, descending in keys]))
+  return db.session.query(*[columns[name].label(name) for name in names])
+
+
+def genres_filter(column, genres, match='all'):
+  '''
+  Rows whose genres include all of the given ones (@>), or any of them with match='any' (&&), both served by
+  the GIN index on the column. The list is cast to the column's type as there is no @> between varchar[] and
+  the text[] a plain array literal would be.
+  '''
+  genres = cast(array(genres), column.type)
+  return column.op('&&' if match == 'any' else '@>', is_comparison=True)(genres)
+
+
+def listing_filters(model, city=None, state=None, genres=None, match='all'):
+  # The venue and artist listing filters as criteria, shared by the listings and their genre facets
+  criteria = []
+  if city:
+    criteria.append(model.city == city)
+  if state:
+    criteria.append(model.state == state)
+  if genres:
+    criteria.append(genres_filter(model.genres, genres, match))
+  return criteria
+
+
+def venues_query(fields, **filters):
+  return _select(VENUE_FIELDS, fields, VENUE_KEYS).filter(*listing_filters(Venue, **filters))
+
+
+def artists_query(fields, **filters):
+  return _select(ARTIST_FIELDS, fields, ARTIST_KEYS).filter(*listing_filters(Artist, **filters))
+
+
+def genre_facets(model, *criteria):
+  '''Number of the model's rows matching the criteria per genre, in one unnest() aggregate, most common first.'''
+  genres = db.session.query(func.unnest(model.genres).label('genre')).filter(*criteria).subquery()
+  return db.session.query(genres.c.genre, func.count().label('count')).group_by(genres.c.genre).order_by(func.count().desc(), genres.c.genre)
+
+
+def _filter_shows(query, start=None, end=None, city=None, state=None, genres=None, match='all', venue_id=None, artist_id=None):
+  # The show filters shared by the listings and the calendar, the query has to join Venue and Artist for
+  # the city, state and genre filters
+  if start:
+    query = query.filter(Show.start_time >= start)
+  if end:
+    query = query.filter(Show.start_time < end)
+  if city:
+    query = query.filter(Venue.city == city)
+  if state:
+    query = query.filter(Venue.state == state)
+  if genres:
+    query = query.filter(genres_filter(Artist.genres, genres, match))
+  if venue_id:
+    query = query.filter(Show.venue_id == venue_id)
+  if artist_id:
+    query = query.filter(Show.artist_id == artist_id)
+  return query
+
+
+def shows_query(fields, **filters):
+  '''
+  Shows joined to their venue and artist, filtered by _filter_shows(): starting in [start, end), city and
+  state are the venue's, the genres are the artist's.
+  '''
+  query = _select(SHOW_FIELDS, fields, SHOW_KEYS).select_from(Show).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id)
+  return _filter_shows(query, **filters)
+
+
+def show_calendar(start, end, city=None, state=None, genres=None, match='all', venue_id=None, artist_id=None):
+  '''
+  Number of shows per day starting in [start, end), in one aggregate query. Days without shows are left out.
+  Venue and Artist are only joined when a filter needs them, unfiltered the count is read off the start time index.
+  '''
+  day = func.date_trunc('day', Show.start_time).label('day')
+  query = db.session.query(day, func.count().label('shows')).select_from(Show)
+  if city or state:
+    query = query.join(Venue, Venue.id == Show.venue_id)
+  if genres:
+    query = query.join(Artist, Artist.id == Show.artist_id)
+  query = _filter_shows(query, start=start, end=end, city=city, state=state, genres=genres, match=match, venue_id=venue_id, artist_id=artist_id)
+  return query.group_by(day).order_by(day)
+
+
+def show_listing(fields, start=None, end=None, city=None, state=None, venue_id=None, artist_id=None):
+  '''
+  The show listing, shows starting in [start, end) or from now on without a start, and the keys to page it
+  with. Ranges that start in the past need the Show table, upcoming ones are read from the upcoming_shows view
+  when it is in use. It still holds the shows that started since its last refresh, so the start filter applies
+  to it as well.
+  '''
+  now = datetime.now()
+  start = start or now
+  if not use_materialized_views() or start < now:
+    return shows_query(fields, start=start, end=end, city=city, state=state, venue_id=venue_id, artist_id=artist_id), SHOW_KEYS
+
+  feed = upcoming_shows_view
+  query = _select(UPCOMING_SHOW_FIELDS, fields, UPCOMING_SHOW_KEYS).filter(feed.c.start_time >= start)
+  if end:
+    query = query.filter(feed.c.start_time < end)
+  if city:
+    query = query.filter(feed.c.city == city)
+  if state:
+    query = query.filter(feed.c.state == state)
+  if venue_id:
+    query = query.filter(feed.c.venue_id == venue_id)
+  if artist_id:
+    query = query.filter(feed.c.artist_id == artist_id)
+  return query, UPCOMING_SHOW_KEYS
+
+
+def booking_conflicts(start, end, venue_id=None, artist_id=None):
+  '''
+  Shows at the venue or by the artist overlapping [start, end), the bookings a new show there would clash with.
+  The range expression is the one in the exclusion constraints, so each side is one probe of their GiST index.
+  No show runs longer than a day, so only shows starting from a day before start can overlap, which bounds
+  start_time and leaves the planner one or two monthly partitions to probe.
+  '''
+  booked = func.tsrange(Show.start_time, Show.start_time + Show.duration)
+  query = db.session.query(
+    Show.id,
+    Show.venue_id,
+    Show.artist_id,
+    Show.start_time,
+    (Show.start_time + Show.duration).label('end_time')
+  ).filter(
+    Show.start_time < end,
+    Show.start_time > start - MAX_SHOW_DURATION,
+    booked.op('&&', is_comparison=True)(func.tsrange(start, end))
+  )
+  return query.filter(or_(
+    *([Show.venue_id == venue_id] if venue_id else []),
+    *([Show.artist_id == artist_id] if artist_id else [])
+  )).order_by(Show.start_time, Show.id)
+
+
+def venue_areas(genres=None, match='all'):
+  '''
+  Every venue with its area and number of upcoming shows, ordered so the areas can be grouped in one pass.
+  The venue_areas view has no genres, filtering by genre reads the Venue table.
+  '''
+  if use_materialized_views() and not genres:
+    areas = venue_areas_view
+    return db.session.query(
+      areas.c.city,
+      areas.c.state,
+      areas.c.id,
+      areas.c.name,
+      areas.c.num_upcoming_shows
+    ).order_by(areas.c.state, areas.c.city, areas.c.id)
+  return Venue.query.with_entities(
+    Venue.city,
+    Venue.state,
+    Venue.id,
+    Venue.name,
+    Venue.upcoming_shows_count.label('num_upcoming_shows')
+  ).filter(*listing_filters(Venue, genres=genres, match=match)).order_by(Venue.state, Venue.city, Venue.id)
+
+
+def search_filters(model, search_term, genres=None, match='all'):
+  # The name search and its genre filter as criteria, shared by the search and its genre facets
+  return [model.name.ilike('%' + search_term + '%')] + listing_filters(model, genres=genres, match=match)
+
+
+def search_query(model, search_term, genres=None, match='all'):
+  '''
+  Name search served by the trigram index, ranked by similarity to the term and narrowed down to the genres.
+  The window count gives the total number of matches across all pages. Page it with search_keys().
+  '''
+  return db.session.query(
+    model.id,
+    model.name,
+    model.upcoming_shows_count.label('num_upcoming_shows'),
+    func.similarity(model.name, search_term).cast(db.Float).label('rank'), # Double precision so the rank survives the round trip through the cursor
+    func.count().over().label('total')
+  ).filter(*search_filters(model, search_term, genres, match)).subquery()
+
+
+def search_keys(matches):
+  return [('rank', matches.c.rank, True), ('name', matches.c.name, False), ('id', matches.c.id, False)]
+
+
+def venue_shows(venue_id):
+  '''Every show at the venue with the artist's name and image link, whether it is upcoming is worked out in SQL.'''
+  return db.session.query(
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time,
+    (Show.start_time > datetime.now()).label('is_upcoming')
+  ).join(Artist, Artist.id == Show.artist_id).filter(Show.venue_id == venue_id).order_by(Show.start_time.asc())
+
+
+def artist_shows(artist_id):
+  '''Every show by the artist with the venue's name and image link, whether it is upcoming is worked out in SQL.'''
+  return db.session.query(
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Venue.image_link.label('venue_image_link'),
+    Show.start_time,
+    (Show.start_time > datetime.now()).label('is_upcoming')
+  ).join(Venue, Venue.id == Show.venue_id).filter(Show.artist_id == artist_id).order_by(Show.start_time.asc())
+
+
+#----------------------------------------------------------------------------#
+# Validators.
+#
+# Cheap queries summarising everything a page shows, used as its ETag and
+# Last-Modified. Each returns one row, whose other columns catch what
+# updated_at alone misses: deleted rows and shows moving from upcoming to
+# past as time goes by. Those only reach the ETag, so only the pages whose
+# deletes also bump an updated_at they read return a last_modified column
+# for Last-Modified. The listings of venues and artists do not, a deleted
+# row leaves the others untouched.
+#----------------------------------------------------------------------------#
+
+def venue_validator(venue_id):
+  '''The venue, its shows and the artists playing them. No row when the venue does not exist.'''
+  return db.session.query(
+    func.greatest(Venue.updated_at, func.max(Show.updated_at), func.max(Artist.updated_at)).label('last_modified'),
+    func.count(Show.id).label('shows'),
+    func.count(Show.id).filter(Show.start_time > datetime.now()).label('upcoming_shows')
+  ).select_from(Venue).outerjoin(Show, Show.venue_id == Venue.id).outerjoin(Artist, Artist.id == Show.artist_id).filter(Venue.id == venue_id).group_by(Venue.id)
+
+
+def artist_validator(artist_id):
+  '''The artist, their shows and the venues hosting them. No row when the artist does not exist.'''
+  return db.session.query(
+    func.greatest(Artist.updated_at, func.max(Show.updated_at), func.max(Venue.updated_at)).label('last_modified'),
+    func.count(Show.id).label('shows'),
+    func.count(Show.id).filter(Show.start_time > datetime.now()).label('upcoming_shows')
+  ).select_from(Artist).outerjoin(Show, Show.artist_id == Artist.id).outerjoin(Venue, Venue.id == Show.venue_id).filter(Artist.id == artist_id).group_by(Artist.id)
+
+
+def listing_validator(model):
+  '''The venue or artist listing, max(updated_at) is read off the index. ETag only, see above.'''
+  return db.session.query(func.max(model.updated_at).label('updated_at'), func.count(model.id).label('rows'))
+
+
+def venue_areas_validator():
+  '''The venue listing. Read from the venue_areas view, the counts change with refreshes as well as with writes.'''
+  if not use_materialized_views():
+    return listing_validator(Venue)
+  areas = venue_areas_view
+  return db.session.query(
+    func.max(areas.c.updated_at).label('updated_at'),
+    func.count(areas.c.id).label('rows'),
+    func.sum(areas.c.num_upcoming_shows).label('upcoming_shows')
+  )
+
+
+def shows_validator(start=None):
+  '''
+  The show listing, whatever its filters. The first upcoming start time changes as soon as a listed show starts,
+  deleted shows are caught by the counter updates bumping their venue's and artist's updated_at. Read from the
+  upcoming_shows view (see show_listing()), the listing only changes when it is refreshed, so the view is
+  summarised instead.
+  '''
+  if use_materialized_views() and (start is None or start >= datetime.now()):
+    feed = upcoming_shows_view
+    return db.session.query(
+      func.max(feed.c.updated_at).label('last_modified'),
+      func.count(feed.c.id).label('shows'),
+      func.min(feed.c.start_time).label('first_upcoming')
+    ).filter(feed.c.start_time >= datetime.now())
+  return db.session.query(
+    func.greatest(
+      db.session.query(func.max(Show.updated_at)).scalar_subquery(),
+      db.session.query(func.max(Venue.updated_at)).scalar_subquery(),
+      db.session.query(func.max(Artist.updated_at)).scalar_subquery()
+    ).label('last_modified'),
+    db.session.query(func.min(Show.start_time)).filter(Show.start_time >= datetime.now()).scalar_subquery().label('first_upcoming')
+  )
@@ -0,0 +1,73 @@
+import random
+from functools import wraps
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
+from sqlalchemy.sql import Delete, Insert, Select, Update
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#
+# With SQLALCHEMY_REPLICA_URIS set, views wrapped in @db.replica_reads send
+# their SELECTs to one of the replicas (picked once per request). Everything
+# else stays on the primary: writes, SELECT ... FOR UPDATE, and any read in a
+# session that has already written, so a view reads back its own writes.
+# Without replicas configured the decorator does nothing.
+#----------------------------------------------------------------------------#
+
+
+class RoutingSession(SignallingSession):
+  '''Session sending plain SELECTs to a replica once use_replica is set and nothing has been written.'''
+
+  def __init__(self, db, **options):
+    SignallingSession.__init__(self, db, **options)
+    self.db = db
+    self.reset_routing()
+
+  def reset_routing(self):
+    self.use_replica = False
+    self.wrote = False
+    self.replica = None
+
+  def get_bind(self, mapper=None, clause=None, **kwargs):
+    if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+      self.wrote = True
+    elif self.use_replica and not self.wrote and isinstance(clause, Select) and clause._for_update_arg is None:
+      replicas = self.app.config['SQLALCHEMY_REPLICA_BINDS']
+      if replicas:
+        if self.replica is None:
+          self.replica = random.choice(replicas)
+        return self.db.get_engine(self.app, bind=self.replica)
+    return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+  '''
+  SQLAlchemy extension registering each of SQLALCHEMY_REPLICA_URIS as a bind ('replica_0', 'replica_1', ...)
+  and handing out RoutingSessions.
+  '''
+
+  def init_app(self, app):
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    replicas = []
+    for number, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS') or []):
+      binds['replica_%d' % number] = uri
+      replicas.append('replica_%d' % number)
+    app.config['SQLALCHEMY_BINDS'] = binds or None
+    app.config['SQLALCHEMY_REPLICA_BINDS'] = replicas
+    SQLAlchemy.init_app(self, app)
+
+    # The session normally goes away with the app context, this covers requests sharing one (the test client's)
+    if replicas:
+      app.before_request(lambda: self.session().reset_routing())
+
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+  def replica_reads(self, view):
+    '''Decorator marking a read-only view, its queries may be served by a replica.'''
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      self.session().use_replica = True
+      return view(*args, **kwargs)
+    wrapper.replica_reads = True # Carried through the other decorators' functools.wraps
+    return wrapper
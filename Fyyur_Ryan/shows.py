@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+import click
+from flask import Blueprint, current_app, flash, render_template, request
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from models import db, Show, Venue, Artist
+from extensions import cache
+from matviews import refresh_after_write
+from conditional import conditional
+from pagination import keyset_page
+from pages import shows_data, show_filters, shows_page_validator
+from queries import show_listing
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('shows', __name__)
+
+#  Show counters
+#  ----------------------------------------------------------------
+
+# Venue and Artist keep upcoming_shows_count and past_shows_count so the listings never have to count shows.
+# Each show records which counter it sits in (counted_as_upcoming). Creating or deleting shows adjusts the
+# counters in the same transaction and roll_shows() moves shows whose start time has passed from upcoming to past.
+
+def count_show(show):
+  upcoming = show.start_time > datetime.now()
+  show.counted_as_upcoming = upcoming
+  counter = 'upcoming_shows_count' if upcoming else 'past_shows_count'
+  for model, model_id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+    column = getattr(model, counter)
+    model.query.filter(model.id == model_id).update({column: column + 1}, synchronize_session=False)
+
+def uncount_shows(*criteria):
+  # Takes the shows matching the criteria off their venue's and artist's counters, one UPDATE per table
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    counts = db.session.query(
+      key.label('id'),
+      func.count().filter(Show.counted_as_upcoming).label('upcoming'),
+      func.count().filter(~Show.counted_as_upcoming).label('past')
+    ).filter(*criteria).group_by(key).subquery()
+    model.query.filter(model.id == counts.c.id).update({
+      model.upcoming_shows_count: model.upcoming_shows_count - counts.c.upcoming,
+      model.past_shows_count: model.past_shows_count - counts.c.past
+    }, synchronize_session=False)
+
+def roll_shows():
+  # One statement, so the flags and the counters move together from the same snapshot: the UPDATE clearing
+  # counted_as_upcoming returns the shows it changed and the counters are adjusted from those rows. A show
+  # committed meanwhile is left for the next run, and an overlapping run waits on the row locks then skips
+  # the shows this one already cleared
+  show = Show.__table__
+  rolled = show.update().where(show.c.counted_as_upcoming, show.c.start_time <= datetime.now()).values(
+    counted_as_upcoming=False
+  ).returning(show.c.venue_id, show.c.artist_id).cte('rolled')
+
+  statement = select(func.count()).select_from(rolled)
+  for model, key in ((Venue, rolled.c.venue_id), (Artist, rolled.c.artist_id)):
+    table = model.__table__
+    counts = select(key.label('id'), func.count().label('started')).group_by(key).subquery()
+    statement = statement.add_cte(table.update().where(table.c.id == counts.c.id).values(
+      upcoming_shows_count=table.c.upcoming_shows_count - counts.c.started,
+      past_shows_count=table.c.past_shows_count + counts.c.started
+    ).cte('rolled_%s' % table.name.lower()))
+
+  rolled = db.session.execute(statement).scalar()
+  db.session.commit()
+  cache.invalidate('venues')
+  refresh_after_write('venue_areas', 'upcoming_shows')
+  return rolled
+
+
+@click.command('roll-shows')
+@with_appcontext
+def roll_shows_command():
+  """Moves shows that have started from the upcoming to the past counters. Meant to run from cron."""
+  print('%d shows moved from upcoming to past' % roll_shows())
+
+
+# SQLSTATE of a row rejected by an exclusion constraint
+EXCLUSION_VIOLATION = '23P01'
+
+
+def show_form():
+  # Imported on first use, as in venues.venue_form()
+  from forms import ShowForm
+  return ShowForm()
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@blueprint.route('/shows')
+@db.replica_reads
+@conditional(shows_page_validator)
+@cache.cached('shows')
+def shows():
+  # Query to get all of the info needed for shows using joins. Without a from date only shows with a start time later than the current time are returned,
+  # the query string can narrow that down to a date range (?from=2026-11-06&to=2026-11-09), an area (?city=Brooklyn&state=NY), a venue or an artist
+  filters, link_args = show_filters(request.args)
+  shows, keys = show_listing(['venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time'], **filters)
+
+  # Fetching one page of shows in ascending order of the start date, with the show id breaking ties between shows starting at the same time
+  shows, prev_cursor, next_cursor = keyset_page(
+    shows,
+    keys,
+    current_app.config['PAGE_SIZE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
+
+  data = shows_data(shows)
+
+  return render_template('pages/shows.html', shows=data, prev_cursor=prev_cursor, next_cursor=next_cursor, filters=link_args)
+
+@blueprint.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  form = show_form()
+  return render_template('forms/new_show.html', form=form)
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  form = show_form()
+
+  # A duration outside 1 minute to a day never reaches the database, an empty booking would overlap nothing
+  if not form.validate():
+    return render_template('forms/new_show.html', form=form), 400
+
+  # Assigning the data from the form to the respective fields in the Show table
+  try:
+    show = Show(
+      start_time = form.start_time.data,
+      venue_id = form.venue_id.data,
+      artist_id = form.artist_id.data,
+      duration = timedelta(minutes=form.duration.data)
+    )
+
+    db.session.add(show)
+    count_show(show) # Adding the show to the venue's and artist's counters in the same transaction
+    db.session.commit()
+    refresh_after_write('venue_areas', 'upcoming_shows')
+    cache.invalidate('shows', 'venues', 'venue:%s' % form.venue_id.data, 'artist:%s' % form.artist_id.data)
+    flash('Show was successfully listed!')
+
+  except IntegrityError as error:
+    db.session.rollback()
+    # The exclusion constraints turn down a show overlapping another booking of the venue or the artist
+    if getattr(error.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+      flash('The venue or the artist is already booked at that time. Show could not be listed.')
+    else:
+      flash('An error occurred. Show could not be listed.')
+  except:
+    db.session.rollback()
+    flash('An error occurred. Show could not be listed.')
+  finally:
+    db.session.close()
+    
+  return render_template('pages/home.html')
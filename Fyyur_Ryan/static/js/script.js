@@ -2,3 +2,74 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// On the new show form, asks the API whether the venue and the artist are still free at the chosen time
+// whenever one of the fields changes, before the form is submitted
+document.addEventListener('DOMContentLoaded', function () {
+  var form = document.querySelector('form[data-availability]');
+  if (!form) return;
+  var fields = ['venue_id', 'artist_id', 'start_time', 'duration'];
+  var status = form.querySelector('.availability');
+  var latest = null;
+
+  function check() {
+    var values = {};
+    fields.forEach(function (name) { values[name] = form.elements[name].value.trim(); });
+    status.textContent = '';
+    if (!values.start_time || !(values.venue_id || values.artist_id)) return;
+
+    var request = latest = new XMLHttpRequest();
+    request.open('GET', form.getAttribute('data-availability') + '?' + fields.map(function (name) {
+      return name + '=' + encodeURIComponent(values[name]);
+    }).join('&'));
+    request.onload = function () {
+      // Answers to earlier checks arriving late are ignored
+      if (request !== latest || request.status !== 200) return;
+      var available = JSON.parse(request.responseText).available;
+      status.className = 'availability ' + (available ? 'text-success' : 'text-danger');
+      status.textContent = available ? 'The venue and the artist are free at that time.' : 'The venue or the artist is already booked at that time.';
+    };
+    request.send();
+  }
+
+  fields.forEach(function (name) { form.elements[name].addEventListener('change', check); });
+});
+
+// Typeahead pickers: typing in an input with data-typeahead lists the matching names from that URL, picking one
+// fills in the id field named by data-target
+document.addEventListener('DOMContentLoaded', function () {
+  Array.prototype.forEach.call(document.querySelectorAll('input[data-typeahead]'), function (input) {
+    var target = document.getElementById(input.getAttribute('data-target'));
+    var list = document.getElementById(input.getAttribute('list'));
+    var ids = {};
+    var latest = null;
+
+    input.addEventListener('input', function () {
+      var value = input.value;
+      if (ids.hasOwnProperty(value)) {
+        target.value = ids[value];
+        var change = document.createEvent('HTMLEvents');
+        change.initEvent('change', true, false);
+        target.dispatchEvent(change); // So the availability check runs for the picked id
+        return;
+      }
+      if (!value.trim()) return;
+
+      var request = latest = new XMLHttpRequest();
+      request.open('GET', input.getAttribute('data-typeahead') + '?q=' + encodeURIComponent(value));
+      request.onload = function () {
+        if (request !== latest || request.status !== 200) return;
+        ids = {};
+        list.innerHTML = '';
+        JSON.parse(request.responseText).data.forEach(function (match) {
+          var label = match.name + ' (#' + match.id + ')';
+          var option = document.createElement('option');
+          option.value = label;
+          list.appendChild(option);
+          ids[label] = match.id;
+        });
+      };
+      request.send();
+    });
+  });
+});
@@ -0,0 +1,191 @@
+import threading
+import time
+from datetime import timedelta
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy import func
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Typeahead.
+#
+# In-memory prefix indexes of the venue and artist names, answering the
+# pickers on the new show form without a database round trip. Each name is
+# indexed under every word it contains, so "vel" finds "Blue Velvet Room".
+# A lookup is a binary search in each of two sorted arrays.
+#
+# Every worker process keeps its own copy. The views that create, rename or
+# delete a venue or an artist update it in the worker that served them, and
+# the other workers pick those changes up through updated_at at most
+# TYPEAHEAD_SYNC_SECONDS later. Deleted rows only drop out of their copy with
+# the full reload every TYPEAHEAD_RELOAD_SECONDS.
+#----------------------------------------------------------------------------#
+
+# Rows committed this long before the last one seen are read again by each sync, so a transaction that
+# committed after a later one it overlapped with is not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _keys(name):
+  # The casefolded name, then every suffix of it starting at a later word
+  name = ' '.join(name.casefold().split())
+  return [name] + [name[start:] for start in range(1, len(name)) if name[start - 1] == ' ']
+
+
+class PrefixIndex(object):
+  '''
+  Names under the prefixes of each of their words. Names are kept in one sorted array of (key, id) pairs and
+  their later words in another, so names starting with the prefix can be listed before the ones that only
+  have a later word starting with it, each read in order from one binary search.
+  '''
+
+  def __init__(self):
+    self._names = {}
+    self._starts = []
+    self._words = []
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._names)
+
+  def load(self, rows):
+    '''Replaces the contents with the (id, name) rows.'''
+    names = {}
+    starts = []
+    words = []
+    for row_id, name in rows:
+      if name:
+        names[row_id] = name
+        keys = _keys(name)
+        starts.append((keys[0], row_id))
+        words.extend((key, row_id) for key in keys[1:])
+    starts.sort()
+    words.sort()
+    with self._lock:
+      self._names, self._starts, self._words = names, starts, words
+
+  def put(self, row_id, name):
+    with self._lock:
+      self._remove(row_id)
+      if name:
+        self._names[row_id] = name
+        keys = _keys(name)
+        insort(self._starts, (keys[0], row_id))
+        for key in keys[1:]:
+          insort(self._words, (key, row_id))
+
+  def remove(self, row_id):
+    with self._lock:
+      self._remove(row_id)
+
+  def _remove(self, row_id):
+    name = self._names.pop(row_id, None)
+    if name is None:
+      return
+    keys = _keys(name)
+    del self._starts[bisect_left(self._starts, (keys[0], row_id))]
+    for key in keys[1:]:
+      del self._words[bisect_left(self._words, (key, row_id))]
+
+  def lookup(self, prefix, limit=10):
+    '''Up to limit (id, name) pairs, the names starting with the prefix first, then those with a later word starting with it.'''
+    prefix = ' '.join(prefix.casefold().split())
+    matches = []
+    if not prefix:
+      return matches
+    with self._lock:
+      for entries in (self._starts, self._words):
+        position = bisect_left(entries, (prefix,))
+        while len(matches) < limit and position < len(entries) and entries[position][0].startswith(prefix):
+          row_id = entries[position][1]
+          if row_id not in matches:
+            matches.append(row_id)
+          position += 1
+      return [(row_id, self._names[row_id]) for row_id in matches]
+
+
+class Typeahead(object):
+  '''
+  Flask extension holding this worker's 'venues' and 'artists' prefix indexes. Configured with
+  TYPEAHEAD_SYNC_SECONDS and TYPEAHEAD_RELOAD_SECONDS.
+  '''
+
+  MODELS = {'venues': Venue, 'artists': Artist}
+
+  def __init__(self, app=None):
+    self.indexes = {}
+    self._synced = {}
+    self._refreshing = set()
+    self._lock = threading.Lock()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('TYPEAHEAD_SYNC_SECONDS', 5)
+    app.config.setdefault('TYPEAHEAD_RELOAD_SECONDS', 600)
+    app.extensions['typeahead'] = self
+    # create_app() does not connect, so each index is loaded by the first lookup in the worker. asgi.py loads
+    # them with warm() when the server starts
+
+  def warm(self):
+    '''Loads both indexes ahead of the first lookup, unless they already are. A failure is logged and they are loaded on first use instead.'''
+    try:
+      for kind in self.MODELS:
+        self.index(kind)
+    except Exception:
+      db.session.rollback()
+      current_app.logger.exception('Loading the typeahead indexes failed')
+
+  def index(self, kind):
+    '''
+    The kind's index, loaded or brought up to date first when it is due. One request at a time runs the
+    queries, outside the lock, while the others read the index as it is.
+    '''
+    with self._lock:
+      index = self.indexes.setdefault(kind, PrefixIndex())
+      loaded, checked, since = self._synced.get(kind, (None, None, None))
+      now = time.monotonic()
+      reload = loaded is None or since is None or now - loaded > current_app.config['TYPEAHEAD_RELOAD_SECONDS']
+      if kind in self._refreshing or not (reload or now - checked > current_app.config['TYPEAHEAD_SYNC_SECONDS']):
+        return index
+      self._refreshing.add(kind)
+    try:
+      if reload:
+        loaded, since = now, self._load(kind, index)
+      else:
+        since = self._sync(kind, index, since)
+      with self._lock:
+        self._synced[kind] = (loaded, now, since)
+    finally:
+      # A failed refresh is tried again by the next request
+      with self._lock:
+        self._refreshing.discard(kind)
+    return index
+
+  def _load(self, kind, index):
+    # One scan of id and name, swapped in whole by PrefixIndex.load(). Returns the latest updated_at read for the
+    # next sync to start from
+    model = self.MODELS[kind]
+    since = db.session.query(func.max(model.updated_at)).scalar()
+    index.load(db.session.query(model.id, model.name).all())
+    return since
+
+  def _sync(self, kind, index, since):
+    # The rows written since the last sync, read off the updated_at index
+    model = self.MODELS[kind]
+    rows = db.session.query(model.id, model.name, model.updated_at).filter(model.updated_at > since - SYNC_OVERLAP).all()
+    for row in rows:
+      index.put(row.id, row.name)
+    return max([since] + [row.updated_at for row in rows])
+
+  def lookup(self, kind, prefix, limit=10):
+    return self.index(kind).lookup(prefix, limit)
+
+  def put(self, kind, row_id, name):
+    # Only indexes that are loaded are kept up to date, the others read the row when they load
+    if kind in self.indexes:
+      self.indexes[kind].put(row_id, name)
+
+  def remove(self, kind, row_id):
+    if kind in self.indexes:
+      self.indexes[kind].remove(row_id)
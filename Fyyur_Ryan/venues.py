@@ -0,0 +1,203 @@
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from models import db, Show, Venue
+from extensions import cache, typeahead
+from matviews import refresh_after_write
+from conditional import conditional
+from pagination import keyset_page
+from pages import venue_areas_data, search_response, venue_page_data, genre_filter, genre_link_args, genre_facets_data
+from queries import venue_areas, venue_areas_validator, venue_validator, venue_shows, listing_filters, genre_facets, search_query, search_keys, search_filters
+from deletes import delete_rows
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('venues', __name__)
+
+# Cached pages are keyed 'index', 'venues', 'artists', 'shows', 'venue:<id>' and 'artist:<id>'.
+# A venue's details appear on its own page, the listings and the pages of the artists playing there.
+
+def venue_cache_keys(venue_id):
+  artists = Show.query.with_entities(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  return ['venues', 'shows', 'venue:%s' % venue_id] + ['artist:%d' % show.artist_id for show in artists]
+
+def venue_form():
+  # Flask-WTF, and Babel's date support with it, are loaded with the first form rather than when a worker boots
+  from forms import VenueForm
+  return VenueForm()
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues')
+@db.replica_reads
+@conditional(venue_areas_validator)
+@cache.cached('venues')
+def venues():
+  # Genres picked from the genre links, ?genre=Jazz&genre=Blues
+  genres, match = genre_filter(request.args)
+
+  # Single query returning every venue with its area, the number of upcoming shows is read off the venue row
+  areas_data = venue_areas_data(venue_areas(genres, match).all())
+
+  # One unnest() aggregate counting the listed venues per genre for the genre links
+  facets = genre_facets_data(genre_facets(Venue, *listing_filters(Venue, genres=genres, match=match)).all(), genres, match)
+
+  return render_template('pages/venues.html', areas=areas_data, genre_facets=facets);
+
+@blueprint.route('/venues/search', methods=['GET', 'POST'])
+@db.replica_reads
+def search_venues():
+  
+  # The search term comes from the navbar form on the first page and from the query string on the following pages
+  search_term = request.values.get('search_term', '')
+  genres, match = genre_filter(request.values)
+
+  # Query to get the results from the search allowing for case sensitive terms, ranked by how similar the name is to the term
+  matches = search_query(Venue, search_term, genres, match)
+
+  # Fetching one page of matches, best ranked first with the name and id breaking ties
+  search_results, prev_cursor, next_cursor = keyset_page(
+    db.session.query(matches),
+    search_keys(matches),
+    current_app.config['SEARCH_PAGE_SIZE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
+
+  response = search_response(search_results, prev_cursor, next_cursor)
+  facets = genre_facets_data(genre_facets(Venue, *search_filters(Venue, search_term, genres, match)).all(), genres, match, search_term=search_term)
+
+  return render_template('pages/search_venues.html', results=response, search_term=search_term, genre_facets=facets, filters=genre_link_args(genres, match))
+
+@blueprint.route('/venues/<int:venue_id>')
+@db.replica_reads
+@conditional(venue_validator)
+@cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+  venue = Venue.query.get(venue_id) # Query to get the info of the venue using the specific venue id
+
+  # Single joined query returning every show for the venue together with the artist's name and image link
+  venue_data = venue_page_data(venue, venue_shows(venue_id).all())
+
+  return render_template('pages/show_venue.html', venue=venue_data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  form = venue_form()
+  return render_template('forms/new_venue.html', form=form)
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  form = venue_form()
+
+  # Assigning each field from the form to the respective columns in the venue database
+  try:
+    venue = Venue (
+      name = request.form['name'],
+      city = request.form['city'],
+      state = request.form['state'],
+      address = request.form['address'],
+      phone = request.form['phone'],
+      image_link = request.form['image_link'],
+      facebook_link = request.form['facebook_link'],
+      genres = request.form.getlist('genres'),
+      website_link = request.form['website_link'],
+      looking_talent = True if 'seeking_talent' in request.form else False,
+      seeking_description = request.form['seeking_description']
+    )
+
+    db.session.add(venue)
+    db.session.flush() # Assigns the id while the row is still loaded, reading it after the commit would select it again
+    venue_id = venue.id
+    db.session.commit()
+    refresh_after_write('venue_areas')
+    cache.invalidate('venues')
+    typeahead.put('venues', venue_id, request.form['name'])
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('An error occurred. Venue ' + venue.name + ' could not be listed.')
+  finally:
+    db.session.close()
+
+  return render_template('pages/home.html')
+
+@blueprint.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  try:
+    # The venue's shows are deleted with it by the database, delete_rows() takes them off their artists' counters first
+    delete_rows('venues', [int(venue_id)])
+    flash('Venue was successfully deleted!')
+  
+  except:
+    db.session.rollback()
+    flash('Deleting the venue encountered an issue')
+  
+  finally:
+    db.session.close()
+  
+  return render_template('pages/home.html')
+
+#  Update
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  form = venue_form()
+  
+  # Query to get the details of the venue from the database using the venue id
+  venue = Venue.query.filter(Venue.id == venue_id).first()
+
+  # Populating the form with the venue info retrieved from the database
+  form.name.data = venue.name
+  form.city.data = venue.city
+  form.state.data = venue.state
+  form.address.data = venue.address
+  form.phone.data = venue.phone
+  form.image_link.data = venue.image_link
+  form.facebook_link.data = venue.facebook_link
+  form.genres.data = venue.genres
+  form.website_link.data = venue.website_link
+  form.seeking_talent.data = venue.looking_talent
+  form.seeking_description.data = venue.seeking_description
+
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  form = venue_form()
+  
+  # Select query to get all the details of the venue from the database using venue id
+  venue_edit = Venue.query.get(venue_id)
+
+  # Updating the venue's details with those entered/changed in the Venue form
+  try:
+    venue_edit.name = request.form['name']
+    venue_edit.city = request.form['city']
+    venue_edit.state = request.form['state']
+    venue_edit.address = request.form['address']
+    venue_edit.phone = request.form['phone']
+    venue_edit.image_link = request.form['image_link']
+    venue_edit.facebook_link = request.form['facebook_link']
+    venue_edit.genres = request.form.getlist('genres')
+    venue_edit.website_link = request.form['website_link']
+    venue_edit.looking_talent = True if 'seeking_talent' in request.form else False
+    venue_edit.seeking_description = request.form['seeking_description']
+
+    db.session.commit()
+    refresh_after_write('venue_areas', 'upcoming_shows')
+    cache.invalidate(*venue_cache_keys(venue_id))
+    typeahead.put('venues', venue_id, request.form['name'])
+    flash('Venue: ' + request.form['name'] + ' details have been successfully changed!')
+
+  except:
+    db.session.rollback()
+    flash('Venue: ' + request.form['name'] + ' details could not be updated.')
+  finally:
+    db.session.close()
+
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))